@@ -1,17 +1,23 @@
 from __future__ import annotations
 
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import fnmatch
+import io
 import json
 import os
 import re
 import shutil
 import subprocess
+import threading
 
 try:
     from openai import OpenAI
@@ -26,6 +32,145 @@ from .orientation import (
     build_step_explanation_prompt,
 )
 
+_NUMBERED_PREFIX_RE = re.compile(r"\s*\d+\s*\|\s")
+_NUMBERED_LINE_RE = re.compile(r"\s*(\d+)\s*\|\s?(.*)$")
+_TOOL_REQUEST_RE = re.compile(r"^\s*TOOL:\s*(\w+)\s*(\{.*\})\s*$", re.DOTALL)
+_FOLLOW_UP_HEADER_RE = re.compile(r"^\s*Follow-ups?:\s*$", re.IGNORECASE)
+_BULLET_RE = re.compile(r"^\s*[-*]\s+")
+_GREP_MATCH_RE = re.compile(r"^(.*?):(\d+):(.*)$", re.MULTILINE)
+_OTHER_LINE_BREAK_RE = re.compile("[\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]")
+# The branch tails are mutually exclusive, so one search picks the same
+# suffix the old hash, paren, range, then line checks did.
+_LOCATION_SUFFIX_RE = re.compile(
+    r"(?:#L(\d+)(?:-L?(\d+))?"
+    r"|\s*[\(\[]\s*(?i:line)\s*(\d+)(?:\s*-\s*(\d+))?\s*[\)\]]\s*"
+    r"|:(\d+)-(\d+)"
+    r"|:(\d+)(?::\d+)?)$"
+)
+_DRIVE_PATH_RE = re.compile(r"^[A-Za-z]:[\\/]")
+# Whole-text form of a per-line match on the stripped line: blanks never cross
+# a newline, and a trailing blank run must be followed by more text.
+_IMPORT_LINE_RE = re.compile(
+    r"^[^\S\n]*(?:"
+    r"import[^\S\n]+\S"
+    r"|from[^\S\n]+.*[^\S\n]+import[^\S\n]+\S"
+    r"|#include"
+    r"|require\("
+    r"|const[^\S\n]+.*[^\S\n]+=[^\S\n]+require\("
+    r"|use[^\S\n]+\S"
+    r")",
+    re.MULTILINE,
+)
+
+_BINARY_SUFFIXES = tuple(
+    suffix
+    for ext in (
+        ".png .jpg .jpeg .gif .bmp .ico .pdf .zip .gz .tgz .bz2 .xz .7z .jar .whl "
+        ".so .dll .dylib .exe .o .a .class .pyc .woff .woff2 .ttf .otf .mp3 .mp4 "
+        ".mov .wav"
+    ).split()
+    for suffix in (ext, ext.upper())
+)
+
+_RG_EXCLUDE_ARGS = tuple(
+    arg
+    for name in (
+        ".git",
+        "node_modules",
+        "__pycache__",
+        ".venv",
+        "venv",
+        "target",
+        "build",
+        "dist",
+    )
+    for arg in ("-g", f"!**/{name}/**")
+)
+
+_IGNORE_DIRS = frozenset(
+    {
+        ".git",
+        "node_modules",
+        "__pycache__",
+        ".venv",
+        "venv",
+        ".mypy_cache",
+        ".pytest_cache",
+        ".tox",
+        "dist",
+        "build",
+        "target",
+    }
+)
+
+_TYPE_PREFIXES = ("class ", "struct ", "type ", "interface ")
+_FUNCTION_PREFIXES = ("def ", "func ", "fn ")
+_DEFINITION_PREFIXES = _FUNCTION_PREFIXES + _TYPE_PREFIXES
+_CONTROL_PREFIXES = ("if", "for", "while", "switch", "catch")
+
+_GREP_WORKERS = min(8, (os.cpu_count() or 1) + 2)
+_GREP_PENDING_SCANS = 256
+_TEXT_CACHE_SIZE = 64
+_DEFINITION_CACHE_SIZE = 256
+
+
+def _number_lines(lines: Iterable[str], first: int) -> str:
+    return "\n".join(
+        f"{number:4d} | {line}" for number, line in enumerate(lines, first)
+    )
+
+
+@lru_cache(maxsize=256)
+def _compile_pattern(pattern: str, flags: int = 0) -> re.Pattern:
+    return re.compile(pattern, flags)
+
+
+def _order_blocks_by_pattern(output: str, patterns: List[str]) -> str:
+    # A single alternation grep reports hits in file order; sort context
+    # blocks by the earliest pattern they match to keep definitions first.
+    compiled = [_compile_pattern(pattern) for pattern in patterns]
+    fallback = len(compiled)
+
+    def rank(block: str) -> int:
+        best = fallback
+        for match in _GREP_MATCH_RE.finditer(block):
+            text = match.group(3)
+            for idx in range(best):
+                if compiled[idx].search(text):
+                    best = idx
+                    break
+        return best
+
+    blocks = output.split("\n--\n")
+    if len(blocks) < 2:
+        return output
+    return "\n--\n".join(sorted(blocks, key=rank))
+
+
+@lru_cache(maxsize=2048)
+def _definition_patterns(symbol: str) -> Tuple[str, ...]:
+    sym = re.escape(symbol)
+    return (
+        rf"\bdef\s+{sym}\s*\(",
+        rf"\bclass\s+{sym}\b",
+        rf"^{sym}\s*=",
+        rf"\bfunc\s+{sym}\s*\(",
+        rf"\bfunc\s+\([^)]+\)\s+{sym}\s*\(",
+        rf"\btype\s+{sym}\b",
+        rf"\bfn\s+{sym}\s*\(",
+        rf"\bstruct\s+{sym}\b",
+        rf"\benum\s+{sym}\b",
+        rf"\bimpl\s+{sym}\b",
+        rf"\bfunction\s+{sym}\s*\(",
+        rf"\bconst\s+{sym}\s*=",
+        rf"\binterface\s+{sym}\b",
+    )
+
+
+@lru_cache(maxsize=256)
+def _definition_regexes(symbol: str) -> Tuple[re.Pattern, ...]:
+    return tuple(re.compile(pattern) for pattern in _definition_patterns(symbol))
+
 
 @dataclass
 class ToolResult:
@@ -58,7 +203,7 @@ class TutorResponse:
     follow_up_suggestions: List[str] = field(default_factory=list)
 
 
-class Phase(Enum):
+class Phase(str, Enum):
     EXPLORE = "explore"
     PLAN = "plan"
     WALK = "walk"
@@ -108,6 +253,7 @@ class AgentState:
     current_step: int = 0
     thinking_history: List[Dict] = field(default_factory=list)
     tool_calls: List[Dict] = field(default_factory=list)
+    tool_output_blocks: List[str] = field(default_factory=list)
     overview_flow: Optional[str] = None
     overview_summary: Optional[str] = None
     overview_data_flow: List[str] = field(default_factory=list)
@@ -272,7 +418,7 @@ TOOL: <tool_name> <json>
 
 Available tools:
 - read_file {{"path": "path", "start_line": 1, "end_line": 200}}
-- search_code {{"pattern": "regex", "file_pattern": "*.py"}}
+- search_code {{"pattern": "regex", "file_pattern": "*.py", "max_count": 20}}
 - find_definition {{"symbol": "Name"}}
 - find_usages {{"symbol": "Name"}}
 
@@ -372,7 +518,7 @@ Follow-ups:
         if not lines:
             return "(no code)"
         first = lines[0]
-        if re.match(r"\s*\d+\s*\|\s", first):
+        if _NUMBERED_PREFIX_RE.match(first):
             return code
         return "\n".join(
             f"{i:>4} | {line}"
@@ -384,7 +530,7 @@ Follow-ups:
     ) -> Optional[tuple[str, Dict[str, Any]]]:
         if not text:
             return None
-        match = re.match(r"^\s*TOOL:\s*(\w+)\s*(\{.*\})\s*$", text, re.DOTALL)
+        match = _TOOL_REQUEST_RE.match(text)
         if not match:
             return None
         name = match.group(1).strip()
@@ -406,6 +552,7 @@ Follow-ups:
             result = self.tools.grep(
                 args.get("pattern", ""),
                 file_pattern=args.get("file_pattern"),
+                max_count=args.get("max_count"),
             )
         elif name == "find_definition":
             result = self.tools.find_definition(args.get("symbol", ""))
@@ -418,18 +565,20 @@ Follow-ups:
         return result.error or "(tool failed)"
 
     def _extract_follow_ups(self, answer: str) -> tuple[str, List[str]]:
+        if "follow-up" not in answer.lower():
+            return answer.strip(), []
         lines = answer.splitlines()
         follow_ups: List[str] = []
         cleaned: List[str] = []
         in_follow = False
         for line in lines:
-            if re.match(r"^\s*Follow-ups?:\s*$", line, re.IGNORECASE):
+            if _FOLLOW_UP_HEADER_RE.match(line):
                 in_follow = True
                 continue
             if in_follow:
                 if not line.strip():
                     continue
-                if re.match(r"^\s*[-*]\s+", line):
+                if _BULLET_RE.match(line):
                     follow_ups.append(line.strip()[2:].strip())
                     continue
                 # Stop if non-bullet content appears
@@ -495,19 +644,12 @@ class CodeWalkerTools:
         self._validate_repo()
         self._rg_available = shutil.which("rg") is not None
         self._file_available = shutil.which("file") is not None
-        self._ignore_dirs = {
-            ".git",
-            "node_modules",
-            "__pycache__",
-            ".venv",
-            "venv",
-            ".mypy_cache",
-            ".pytest_cache",
-            ".tox",
-            "dist",
-            "build",
-            "target",
-        }
+        self._text_cache: OrderedDict = OrderedDict()
+        self._text_lock = threading.Lock()
+        self._lines_cache: OrderedDict = OrderedDict()
+        self._lines_lock = threading.Lock()
+        self._definition_cache: OrderedDict = OrderedDict()
+        self._definition_lock = threading.Lock()
 
     # ===== File System Tools =====
 
@@ -519,37 +661,42 @@ class CodeWalkerTools:
             return ToolResult(False, "", f"Path not found: {path}")
 
         lines: List[str] = [self._format_path(target)]
+        if not target.is_dir() or max_depth <= 0:
+            return ToolResult(True, "\n".join(lines))
 
-        def walk(current: Path, prefix: str, depth: int) -> None:
-            if depth >= max_depth:
-                return
+        stack: deque = deque()
+
+        def expand(current, prefix: str, depth: int) -> None:
             try:
-                entries = sorted(
-                    current.iterdir(), key=lambda p: (not p.is_dir(), p.name.lower())
-                )
+                with os.scandir(current) as it:
+                    entries = sorted(
+                        it, key=lambda e: (not e.is_dir(), e.name.lower())
+                    )
             except PermissionError:
                 lines.append(f"{prefix}\\-- [permission denied]")
                 return
-            filtered: List[Path] = []
+            filtered: List[os.DirEntry] = []
             for entry in entries:
                 name = entry.name
                 if not include_hidden and name.startswith("."):
                     continue
-                if name in self._ignore_dirs:
+                if name in _IGNORE_DIRS:
                     continue
                 if name.endswith(".pyc"):
                     continue
                 filtered.append(entry)
-            for index, entry in enumerate(filtered):
-                is_last = index == len(filtered) - 1
-                connector = "\\--" if is_last else "|--"
-                lines.append(f"{prefix}{connector} {entry.name}")
-                if entry.is_dir():
-                    extension = "    " if is_last else "|   "
-                    walk(entry, prefix + extension, depth + 1)
-
-        if target.is_dir():
-            walk(target, "", 0)
+            last = len(filtered) - 1
+            for index in range(last, -1, -1):
+                stack.append((filtered[index], prefix, depth, index == last))
+
+        expand(target, "", 0)
+        while stack:
+            entry, prefix, depth, is_last = stack.pop()
+            connector = "\\--" if is_last else "|--"
+            lines.append(f"{prefix}{connector} {entry.name}")
+            if depth + 1 < max_depth and entry.is_dir():
+                extension = "    " if is_last else "|   "
+                expand(entry.path, prefix + extension, depth + 1)
         return ToolResult(True, "\n".join(lines))
 
     def read_file(
@@ -561,16 +708,21 @@ class CodeWalkerTools:
         if not target.is_file():
             return ToolResult(False, "", f"Not a file: {path}")
         try:
-            content = self._read_text(target)
-            lines = content.split("\n")
             start = max(0, (start_line or 1) - 1)
-            end = end_line if end_line is not None else len(lines)
-            end = min(len(lines), end)
-            slice_lines = lines[start:end]
-            numbered = [
-                f"{i + start + 1:4d} | {line}" for i, line in enumerate(slice_lines)
-            ]
-            return ToolResult(True, "\n".join(numbered))
+            if end_line is not None and end_line >= 0:
+                stop = max(start, end_line)
+                with target.open(encoding="utf-8", errors="replace") as handle:
+                    raw = list(islice(handle, start, stop))
+                if raw or start >= stop:
+                    lines = [line.rstrip("\n") for line in raw]
+                    # split("\n") below yields a final empty line after a
+                    # trailing newline; keep the two paths numbering alike.
+                    if len(raw) < stop - start and raw[-1].endswith("\n"):
+                        lines.append("")
+                    return ToolResult(True, _number_lines(lines, start + 1))
+            lines = self._read_text(target).split("\n")
+            end = len(lines) if end_line is None else end_line
+            return ToolResult(True, _number_lines(lines[start:end], start + 1))
         except Exception as exc:
             return ToolResult(False, "", str(exc))
 
@@ -580,7 +732,8 @@ class CodeWalkerTools:
             return ToolResult(False, "", f"Path not found: {path}")
         if not target.is_dir():
             return ToolResult(False, "", f"Not a directory: {path}")
-        entries = sorted(target.iterdir(), key=lambda p: p.name.lower())
+        with os.scandir(target) as it:
+            entries = sorted(it, key=lambda e: e.name.lower())
         lines: List[str] = []
         for entry in entries:
             stat = entry.stat()
@@ -622,29 +775,22 @@ class CodeWalkerTools:
         file_pattern: str = None,
         context_lines: int = 2,
         ignore_case: bool = False,
+        max_count: Optional[int] = None,
     ) -> ToolResult:
         target = self._resolve_path(path)
         if self._rg_available:
             cmd = ["rg", "-n", f"-C{context_lines}"]
             if ignore_case:
                 cmd.append("-i")
-            for glob in [
-                "**/.git/**",
-                "**/node_modules/**",
-                "**/__pycache__/**",
-                "**/.venv/**",
-                "**/venv/**",
-                "**/target/**",
-                "**/build/**",
-                "**/dist/**",
-            ]:
-                cmd.extend(["-g", f"!{glob}"])
+            if max_count:
+                cmd.append(f"-m{max_count}")
+            cmd.extend(_RG_EXCLUDE_ARGS)
             if file_pattern:
                 cmd.extend(["-g", file_pattern])
             cmd.extend([pattern, str(target)])
             return self._run(cmd, allow_empty=True)
         return self._python_grep(
-            pattern, target, file_pattern, context_lines, ignore_case
+            pattern, target, file_pattern, context_lines, ignore_case, max_count
         )
 
     def git_grep(self, pattern: str, file_pattern: str = None) -> ToolResult:
@@ -674,6 +820,12 @@ class CodeWalkerTools:
         return ToolResult(True, "\n".join(sorted(results)))
 
     def find_definition(self, symbol: str, language: str = None) -> ToolResult:
+        cache_key = (symbol, language)
+        with self._definition_lock:
+            cached = self._definition_cache.get(cache_key)
+            if cached is not None:
+                self._definition_cache.move_to_end(cache_key)
+                return cached
         sym = re.escape(symbol)
         patterns = {
             "python": [
@@ -715,18 +867,22 @@ class CodeWalkerTools:
             search_patterns = []
             for lang_patterns in patterns.values():
                 search_patterns.extend(lang_patterns)
-        results: List[str] = []
-        for pattern in search_patterns:
-            result = self.grep(pattern, context_lines=3)
-            if result.success and result.output not in (
-                "",
-                "(no matches)",
-                "(empty output)",
-            ):
-                results.append(result.output)
-        if results:
-            return ToolResult(True, "\n---\n".join(results))
-        return ToolResult(True, f"No definition found for: {symbol}")
+        unique_patterns = list(dict.fromkeys(search_patterns))
+        combined = "|".join(f"(?:{pattern})" for pattern in unique_patterns)
+        result = self.grep(combined, context_lines=3)
+        if not result.success:
+            return ToolResult(True, f"No definition found for: {symbol}")
+        if result.output not in ("", "(no matches)", "(empty output)"):
+            found = ToolResult(
+                True, _order_blocks_by_pattern(result.output, unique_patterns)
+            )
+        else:
+            found = ToolResult(True, f"No definition found for: {symbol}")
+        with self._definition_lock:
+            self._definition_cache[cache_key] = found
+            if len(self._definition_cache) > _DEFINITION_CACHE_SIZE:
+                self._definition_cache.popitem(last=False)
+        return found
 
     def find_usages(self, symbol: str) -> ToolResult:
         return self.grep(symbol, context_lines=1)
@@ -734,47 +890,37 @@ class CodeWalkerTools:
     # ===== Code Analysis Tools =====
 
     def get_function(self, file_path: str, function_name: str) -> ToolResult:
-        result = self.read_file(file_path)
-        if not result.success:
-            return result
-        lines = result.output.split("\n")
+        lines, error = self._source_lines(file_path)
+        if lines is None:
+            return ToolResult(False, "", error)
         in_function = False
         function_lines: List[str] = []
         base_indent = 0
-        for line in lines:
-            if " | " in line:
-                _, code = line.split(" | ", 1)
-            else:
-                code = line
+        for number, code in enumerate(lines, 1):
             if not in_function:
                 if self._is_function_def(code, function_name):
                     in_function = True
                     base_indent = len(code) - len(code.lstrip())
-                    function_lines.append(line)
+                    function_lines.append(f"{number:4d} | {code}")
             else:
                 stripped = code.strip()
                 if stripped:
                     current_indent = len(code) - len(code.lstrip())
                     if current_indent <= base_indent and self._is_new_definition(code):
                         break
-                function_lines.append(line)
+                function_lines.append(f"{number:4d} | {code}")
         if function_lines:
             return ToolResult(True, "\n".join(function_lines))
         return ToolResult(False, "", f"Function not found: {function_name}")
 
     def get_class(self, file_path: str, class_name: str) -> ToolResult:
-        result = self.read_file(file_path)
-        if not result.success:
-            return result
-        lines = result.output.split("\n")
+        lines, error = self._source_lines(file_path)
+        if lines is None:
+            return ToolResult(False, "", error)
         in_class = False
         class_lines: List[str] = []
         base_indent = 0
-        for line in lines:
-            if " | " in line:
-                _, code = line.split(" | ", 1)
-            else:
-                code = line
+        for number, code in enumerate(lines, 1):
             if not in_class:
                 if (
                     f"class {class_name}" in code
@@ -783,67 +929,49 @@ class CodeWalkerTools:
                 ):
                     in_class = True
                     base_indent = len(code) - len(code.lstrip())
-                    class_lines.append(line)
+                    class_lines.append(f"{number:4d} | {code}")
             else:
                 stripped = code.strip()
                 if stripped:
                     current_indent = len(code) - len(code.lstrip())
                     if current_indent <= base_indent and self._is_new_definition(code):
                         break
-                class_lines.append(line)
+                class_lines.append(f"{number:4d} | {code}")
         if class_lines:
             return ToolResult(True, "\n".join(class_lines))
         return ToolResult(False, "", f"Class not found: {class_name}")
 
     def get_imports(self, file_path: str) -> ToolResult:
-        result = self.read_file(file_path)
-        if not result.success:
-            return result
-        import_patterns = [
-            r"^import\s+",
-            r"^from\s+.*\s+import\s+",
-            r"^#include",
-            r"^require\(",
-            r"^const\s+.*\s+=\s+require\(",
-            r"^use\s+",
-        ]
+        text, error = self._source_text(file_path)
+        if text is None:
+            return ToolResult(False, "", error)
         imports: List[str] = []
-        for line in result.output.split("\n"):
-            if " | " in line:
-                _, code = line.split(" | ", 1)
-            else:
-                code = line
-            for pattern in import_patterns:
-                if re.match(pattern, code.strip()):
-                    imports.append(line)
-                    break
+        number = 1
+        position = 0
+        for match in _IMPORT_LINE_RE.finditer(text):
+            start = match.start()
+            number += text.count("\n", position, start)
+            position = start
+            end = text.find("\n", start)
+            code = text[start:] if end == -1 else text[start:end]
+            imports.append(f"{number:4d} | {code}")
         return ToolResult(True, "\n".join(imports) if imports else "No imports found")
 
     def get_outline(self, file_path: str) -> ToolResult:
-        result = self.read_file(file_path)
-        if not result.success:
-            return result
+        lines, error = self._source_lines(file_path)
+        if lines is None:
+            return ToolResult(False, "", error)
         outline: List[str] = []
-        for line in result.output.split("\n"):
-            if " | " not in line:
-                continue
-            line_num, code = line.split(" | ", 1)
-            line_num = line_num.strip()
+        for line_num, code in enumerate(lines, 1):
             stripped = code.strip()
             indent = len(code) - len(code.lstrip())
-            if any(
-                stripped.startswith(kw)
-                for kw in ["class ", "struct ", "type ", "interface "]
-            ):
+            if stripped.startswith(_TYPE_PREFIXES):
                 outline.append(f"L{line_num}: {stripped}")
-            elif any(stripped.startswith(kw) for kw in ["def ", "func ", "fn "]):
+            elif stripped.startswith(_FUNCTION_PREFIXES):
                 prefix = "  " if indent > 0 else ""
                 outline.append(f"L{line_num}: {prefix}{stripped.split(':')[0]}")
             elif ("(" in stripped and "):" in stripped) or ") {" in stripped:
-                if not any(
-                    stripped.startswith(kw)
-                    for kw in ["if", "for", "while", "switch", "catch"]
-                ):
+                if not stripped.startswith(_CONTROL_PREFIXES):
                     prefix = "  " if indent > 0 else ""
                     outline.append(f"L{line_num}: {prefix}{stripped}")
         return ToolResult(True, "\n".join(outline) if outline else "No outline available")
@@ -883,7 +1011,11 @@ class CodeWalkerTools:
     # ===== Helpers =====
 
     def _resolve_path(self, path: str) -> Path:
-        expanded = os.path.expandvars(os.path.expanduser(path))
+        expanded = path
+        if expanded.startswith("~"):
+            expanded = os.path.expanduser(expanded)
+        if "$" in expanded or "%" in expanded:
+            expanded = os.path.expandvars(expanded)
         candidate = Path(expanded)
         if candidate.is_absolute():
             return candidate
@@ -921,7 +1053,48 @@ class CodeWalkerTools:
             raise ValueError(f"Repository path does not exist: {self.repo_path}")
 
     def _read_text(self, path: Path) -> str:
-        return path.read_text(encoding="utf-8", errors="replace")
+        stat = path.stat()
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+        with self._text_lock:
+            text = self._text_cache.get(key)
+            if text is not None:
+                self._text_cache.move_to_end(key)
+                return text
+        text = path.read_text(encoding="utf-8", errors="replace")
+        with self._text_lock:
+            self._text_cache[key] = text
+            if len(self._text_cache) > _TEXT_CACHE_SIZE:
+                self._text_cache.popitem(last=False)
+        return text
+
+    def _source_text(self, path: str) -> Tuple[Optional[str], Optional[str]]:
+        target = self._resolve_path(path)
+        if not target.exists():
+            return None, f"File not found: {path}"
+        if not target.is_file():
+            return None, f"Not a file: {path}"
+        try:
+            return self._read_text(target), None
+        except Exception as exc:
+            return None, str(exc)
+
+    def _source_lines(self, path: str) -> Tuple[Optional[List[str]], Optional[str]]:
+        text, error = self._source_text(path)
+        if text is None:
+            return None, error
+        # _read_text hands back the cached string, so the key hashes once and
+        # later lookups hit on identity.
+        with self._lines_lock:
+            lines = self._lines_cache.get(text)
+            if lines is not None:
+                self._lines_cache.move_to_end(text)
+                return lines, None
+        lines = text.split("\n")
+        with self._lines_lock:
+            self._lines_cache[text] = lines
+            if len(self._lines_cache) > _TEXT_CACHE_SIZE:
+                self._lines_cache.popitem(last=False)
+        return lines, None
 
     def _is_function_def(self, code: str, name: str) -> bool:
         patterns = [
@@ -933,23 +1106,19 @@ class CodeWalkerTools:
         return any(p in code for p in patterns)
 
     def _is_new_definition(self, code: str) -> bool:
-        keywords = ["def ", "class ", "func ", "fn ", "type ", "struct ", "interface "]
-        stripped = code.strip()
-        return any(stripped.startswith(kw) for kw in keywords)
+        return code.strip().startswith(_DEFINITION_PREFIXES)
 
     def _should_skip_dir(self, name: str) -> bool:
-        if name in self._ignore_dirs:
-            return True
-        if name.startswith("."):
-            return True
-        return False
+        return name in _IGNORE_DIRS or name.startswith(".")
 
-    def _iter_files(self, root: Path, file_pattern: Optional[str]) -> Iterable[Path]:
+    def _iter_files(self, root: Path, file_pattern: Optional[str]) -> Iterator[Path]:
+        name_matches = None
+        if file_pattern:
+            name_matches = _compile_pattern(fnmatch.translate(file_pattern)).match
         if root.is_file():
-            if file_pattern and not fnmatch.fnmatch(root.name, file_pattern):
-                return []
-            return [root]
-        results: List[Path] = []
+            if not name_matches or name_matches(root.name):
+                yield root
+            return
         for dirpath, dirnames, filenames in os.walk(root):
             dirnames[:] = [d for d in dirnames if not self._should_skip_dir(d)]
             for name in filenames:
@@ -957,18 +1126,20 @@ class CodeWalkerTools:
                     continue
                 if name.startswith("."):
                     continue
-                if file_pattern and not fnmatch.fnmatch(name, file_pattern):
+                if name_matches and not name_matches(name):
                     continue
-                results.append(Path(dirpath) / name)
-        return results
+                yield Path(dirpath) / name
 
-    def _is_binary_file(self, path: Path) -> bool:
+    def _read_source_text(self, path: Path) -> Optional[str]:
         try:
             with path.open("rb") as handle:
-                chunk = handle.read(2048)
-            return b"\0" in chunk
+                head = handle.read(2048)
+                if b"\0" in head:
+                    return None
+                data = head + handle.read()
         except Exception:
-            return True
+            return None
+        return data.decode("utf-8", errors="replace")
 
     def _python_grep(
         self,
@@ -977,33 +1148,70 @@ class CodeWalkerTools:
         file_pattern: Optional[str],
         context_lines: int,
         ignore_case: bool,
+        max_count: Optional[int] = None,
     ) -> ToolResult:
         flags = re.IGNORECASE if ignore_case else 0
         try:
-            regex = re.compile(pattern, flags)
+            regex = _compile_pattern(pattern, flags)
         except re.error as exc:
             return ToolResult(False, "", f"Invalid regex: {exc}")
-        matches: List[str] = []
-        for file_path in self._iter_files(target, file_pattern):
-            if self._is_binary_file(file_path):
-                continue
-            text = self._read_text(file_path)
+        # Whole-file search rejects non-matching files without splitting them;
+        # skipped for patterns whose meaning depends on line edges.
+        prefilter = None
+        if not any(token in pattern for token in ("(?", "\\A", "\\Z")):
+            prefilter = _compile_pattern(pattern, flags | re.MULTILINE)
+        # MULTILINE anchors only see "\n"; splitlines() also breaks on "\r" etc.
+        anchored = "^" in pattern or "$" in pattern
+        files = (
+            file_path
+            for file_path in self._iter_files(target, file_pattern)
+            if not file_path.name.endswith(_BINARY_SUFFIXES)
+        )
+
+        def scan(file_path: Path) -> str:
+            text = self._read_source_text(file_path)
+            if text is None:
+                return ""
+            if (
+                prefilter is not None
+                and not (anchored and _OTHER_LINE_BREAK_RE.search(text))
+                and not prefilter.search(text)
+            ):
+                return ""
             lines = text.splitlines()
+            display_path = None
+            found = io.StringIO()
+            hits = 0
             for i, line in enumerate(lines):
+                if max_count and hits >= max_count:
+                    break
                 if regex.search(line):
+                    hits += 1
+                    if display_path is None:
+                        display_path = self._format_path(file_path)
                     start = max(0, i - context_lines)
                     end = min(len(lines), i + context_lines + 1)
                     for j in range(start, end):
                         prefix = ":" if j == i else "-"
-                        matches.append(
-                            f"{self._format_path(file_path)}:{j + 1}{prefix}{lines[j]}"
-                        )
-                    matches.append("--")
-        if not matches:
+                        found.write(f"{display_path}:{j + 1}{prefix}{lines[j]}\n")
+                    found.write("--\n")
+            return found.getvalue()
+
+        matches = io.StringIO()
+        # Submit paths as the walk yields them, keeping a bounded window of
+        # in-flight scans; results are written in walk order.
+        with ThreadPoolExecutor(max_workers=_GREP_WORKERS) as executor:
+            pending: deque = deque()
+            for file_path in files:
+                pending.append(executor.submit(scan, file_path))
+                if len(pending) >= _GREP_PENDING_SCANS:
+                    matches.write(pending.popleft().result())
+            while pending:
+                matches.write(pending.popleft().result())
+        output = matches.getvalue()
+        if not output:
             return ToolResult(True, "(no matches)")
-        if matches[-1] == "--":
-            matches.pop()
-        return ToolResult(True, "\n".join(matches))
+        return ToolResult(True, output[: -len("\n--\n")])
 
     def _format_path(self, path: Path) -> str:
         try:
@@ -1016,7 +1224,7 @@ class CodeWalkerAgent:
     TOOL_DESCRIPTIONS = [
         '1. tree(path=".", max_depth=3, include_hidden=False) - Show directory structure',
         "2. read_file(path, start_line=None, end_line=None) - Read file contents",
-        "3. grep(pattern, path='.', file_pattern=None, context_lines=2) - Search for pattern",
+        "3. grep(pattern, path='.', file_pattern=None, context_lines=2, max_count=None) - Search for pattern",
         "4. git_grep(pattern, file_pattern=None) - Search tracked files",
         "5. find_files(name_pattern, file_type='f') - Find files by name",
         "6. find_definition(symbol, language=None) - Find where symbol is defined",
@@ -1031,6 +1239,7 @@ class CodeWalkerAgent:
         "15. git_show(commit, file_path=None) - Show a commit",
         "16. git_blame(file_path, start_line=None, end_line=None) - Line authorship",
     ]
+    TOOLS_TEXT = "\n".join(TOOL_DESCRIPTIONS)
 
     def __init__(
         self,
@@ -1046,6 +1255,7 @@ class CodeWalkerAgent:
         client: Optional[LLMClient] = None,
     ):
         self.tools = CodeWalkerTools(repo_path)
+        self._path_definition_cache: OrderedDict = OrderedDict()
         self.client = client or LLMClient(model=model)
         self.model = model
         self.state: Optional[AgentState] = None
@@ -1118,7 +1328,7 @@ class CodeWalkerAgent:
     ) -> str:
         response = self.client.generate(messages, max_output_tokens=max_output_tokens)
         model = getattr(self.client, "model", self.model)
-        phase = self.state.phase.value if self.state else None
+        phase = self.state.phase if self.state else None
         self.llm_logger.log_call(
             caller=caller,
             phase=phase,
@@ -1166,7 +1376,7 @@ class CodeWalkerAgent:
             user_request=self.state.user_request,
             repo_path=self.state.repo_path,
             exploration_context=exploration_context,
-            tool_descriptions=self.TOOL_DESCRIPTIONS,
+            tools_text=self.TOOLS_TEXT,
             repeat_warning=repeat_warning,
         )
         messages = [
@@ -1229,6 +1439,10 @@ class CodeWalkerAgent:
                 "error": result.error,
             }
         )
+        self.state.tool_output_blocks.append(
+            f"### {action.get('tool')}({action.get('args', {})})\n```\n"
+            f"{result.output or ''}\n```"
+        )
 
     def _update_exploration_context(self, action: Dict, result: ToolResult) -> None:
         if not result.success:
@@ -1241,11 +1455,16 @@ class CodeWalkerAgent:
             path = action.get("args", {}).get("path", "").lower()
             if "readme" in path:
                 ctx.readme_content = result.output
-            elif any(x in path for x in ["config", "main", "app", "server"]):
+            elif (
+                "config" in path
+                or "main" in path
+                or "app" in path
+                or "server" in path
+            ):
                 ctx.key_files.append(
                     {"path": action["args"]["path"], "preview": result.output}
                 )
-        elif tool in ["grep", "git_grep", "find_definition"]:
+        elif tool in ("grep", "git_grep", "find_definition"):
             ctx.relevant_searches.append(
                 {
                     "query": action.get("args", {}).get("pattern")
@@ -1253,7 +1472,7 @@ class CodeWalkerAgent:
                     "results": result.output,
                 }
             )
-        elif tool in ["get_class", "get_function"]:
+        elif tool in ("get_class", "get_function"):
             ctx.data_structures_found.append(
                 {
                     "name": action.get("args", {}).get("class_name")
@@ -1310,12 +1529,7 @@ class CodeWalkerAgent:
                 ]
             )
             parts.append(f"### Tool Call History\n{calls_text}")
-            outputs_text = "\n\n".join(
-                [
-                    f"### {c['tool']}({c['args']})\n```\n{(c.get('output') or '')}\n```"
-                    for c in self.state.tool_calls[-3:]
-                ]
-            )
+            outputs_text = "\n\n".join(self.state.tool_output_blocks[-3:])
             parts.append(f"### Recent Tool Outputs\n{outputs_text}")
         return "\n\n".join(parts) if parts else "(No exploration done yet)"
 
@@ -1389,13 +1603,8 @@ class CodeWalkerAgent:
         print(f"  ({self.state.plan.total_steps} steps)")
 
     def _format_full_tool_results(self) -> str:
-        parts: List[str] = []
-        for call in self.state.tool_calls:
-            output = call.get("output") or ""
-            parts.append(
-                f"### {call.get('tool')}({call.get('args')})\n```\n{output}\n```"
-            )
-        return "\n\n".join(parts) if parts else "(no tool results)"
+        blocks = self.state.tool_output_blocks
+        return "\n\n".join(blocks) if blocks else "(no tool results)"
 
     def _initialize_overview(self) -> None:
         if not self.state or not self.state.plan:
@@ -1766,10 +1975,12 @@ class CodeWalkerAgent:
         self, code: str
     ) -> tuple[str, Optional[int]]:
         lines = code.splitlines()
+        if "|" not in code:
+            return "\n".join(lines).rstrip(), None
         start_line: Optional[int] = None
         cleaned_lines: List[str] = []
         for line in lines:
-            match = re.match(r"\s*(\d+)\s*\|\s?(.*)$", line)
+            match = _NUMBERED_LINE_RE.match(line) if "|" in line else None
             if match:
                 if start_line is None:
                     start_line = int(match.group(1))
@@ -1846,35 +2057,28 @@ class CodeWalkerAgent:
     ) -> tuple[str, Optional[int], Optional[int]]:
         cleaned = self._clean_file_path(file_path)
 
-        hash_match = re.search(r"#L(\d+)(?:-L?(\d+))?$", cleaned)
-        if hash_match:
-            start = int(hash_match.group(1))
-            end = int(hash_match.group(2)) if hash_match.group(2) else None
-            return cleaned[: hash_match.start()].strip(), start, end
-
-        paren_match = re.search(
-            r"\s*[\(\[]\s*line\s*(\d+)(?:\s*-\s*(\d+))?\s*[\)\]]\s*$",
-            cleaned,
-            re.IGNORECASE,
-        )
-        if paren_match:
-            start = int(paren_match.group(1))
-            end = int(paren_match.group(2)) if paren_match.group(2) else None
-            return cleaned[: paren_match.start()].strip(), start, end
-
-        if ":" in cleaned and not re.match(r"^[A-Za-z]:[\\/]", cleaned):
-            range_match = re.search(r":(\d+)-(\d+)$", cleaned)
-            if range_match:
-                start = int(range_match.group(1))
-                end = int(range_match.group(2))
-                return cleaned[: range_match.start()].strip(), start, end
-
-            colon_match = re.search(r":(\d+)(?::\d+)?$", cleaned)
-            if colon_match:
-                start = int(colon_match.group(1))
-                return cleaned[: colon_match.start()].strip(), start, None
-
-        return cleaned, None, None
+        match = _LOCATION_SUFFIX_RE.search(cleaned)
+        if not match:
+            return cleaned, None, None
+        base = cleaned[: match.start()].strip()
+        (
+            hash_start,
+            hash_end,
+            paren_start,
+            paren_end,
+            range_start,
+            range_end,
+            line,
+        ) = match.groups()
+        if hash_start:
+            return base, int(hash_start), int(hash_end) if hash_end else None
+        if paren_start:
+            return base, int(paren_start), int(paren_end) if paren_end else None
+        if _DRIVE_PATH_RE.match(cleaned):
+            return cleaned, None, None
+        if range_start:
+            return base, int(range_start), int(range_end)
+        return base, int(line), None
 
     def _clean_file_path(self, file_path: str) -> str:
         cleaned = file_path.strip().strip('"').strip("'")
@@ -1909,49 +2113,49 @@ class CodeWalkerAgent:
     def _find_definition_in_path(
         self, symbol: str, search_path: str
     ) -> Optional[tuple[str, int]]:
-        patterns = self._definition_patterns(symbol)
-        for pattern in patterns:
-            result = self.tools.grep(
-                pattern, path=search_path, context_lines=0, ignore_case=False
+        # Misses are cached as None so repeated unresolved symbols skip grep.
+        cache_key = (symbol, search_path)
+        if cache_key in self._path_definition_cache:
+            self._path_definition_cache.move_to_end(cache_key)
+            return self._path_definition_cache[cache_key]
+        match = self._grep_definition_in_path(symbol, search_path)
+        self._path_definition_cache[cache_key] = match
+        if len(self._path_definition_cache) > _DEFINITION_CACHE_SIZE:
+            self._path_definition_cache.popitem(last=False)
+        return match
+
+    def _grep_definition_in_path(
+        self, symbol: str, search_path: str
+    ) -> Optional[tuple[str, int]]:
+        patterns = _definition_patterns(symbol)
+        # Cap hits per file at one per pattern so grep can stop early; a
+        # file would need that many definition lines to hide a better one.
+        result = self.tools.grep(
+            "|".join(f"(?:{pattern})" for pattern in patterns),
+            path=search_path,
+            context_lines=0,
+            ignore_case=False,
+            max_count=len(patterns),
+        )
+        if not result.success or result.output in ("(no matches)", "(empty output)", ""):
+            return None
+        # One grep for all patterns; the earliest pattern a line matches keeps
+        # the old one-grep-per-pattern priority.
+        compiled = _definition_regexes(symbol)
+        best: Optional[tuple[int, str, int]] = None
+        for match in _GREP_MATCH_RE.finditer(result.output):
+            text = match.group(3)
+            rank = next(
+                (idx for idx, regex in enumerate(compiled) if regex.search(text)),
+                len(compiled),
             )
-            if not result.success or result.output in ("(no matches)", "(empty output)", ""):
-                continue
-            match = self._parse_grep_first_match(result.output)
-            if match:
-                return match
-        return None
-
-    def _definition_patterns(self, symbol: str) -> List[str]:
-        sym = re.escape(symbol)
-        return [
-            rf"\bdef\s+{sym}\s*\(",
-            rf"\bclass\s+{sym}\b",
-            rf"^{sym}\s*=",
-            rf"\bfunc\s+{sym}\s*\(",
-            rf"\bfunc\s+\([^)]+\)\s+{sym}\s*\(",
-            rf"\btype\s+{sym}\b",
-            rf"\bfn\s+{sym}\s*\(",
-            rf"\bstruct\s+{sym}\b",
-            rf"\benum\s+{sym}\b",
-            rf"\bimpl\s+{sym}\b",
-            rf"\bfunction\s+{sym}\s*\(",
-            rf"\bconst\s+{sym}\s*=",
-            rf"\binterface\s+{sym}\b",
-        ]
-
-    def _parse_grep_first_match(self, output: str) -> Optional[tuple[str, int]]:
-        for line in output.splitlines():
-            if not line or line.startswith("--"):
-                continue
-            match = re.match(r"^(.*?):(\d+):", line)
-            if match:
-                path = match.group(1)
-                try:
-                    line_number = int(match.group(2))
-                except ValueError:
-                    continue
-                return path, line_number
-        return None
+            if best is None or rank < best[0]:
+                best = (rank, match.group(1), int(match.group(2)))
+                if rank == 0:
+                    break
+        if best is None:
+            return None
+        return best[1], best[2]
 
     def _log_debug(self, message: str) -> None:
         if self.verbose:
@@ -1,35 +1,18 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Dict, List
 
 
-def build_exploration_prompt(
-    user_request: str,
-    repo_path: str,
-    exploration_context: str,
-    tool_descriptions: List[str],
-    repeat_warning: str | None = None,
-) -> str:
-    tools_text = "\n".join(tool_descriptions)
-    warning_text = ""
-    if repeat_warning:
-        warning_text = f"\n## Repeat Guard\n{repeat_warning}\n"
-    return f"""You are exploring a codebase to understand: "{user_request}"
+_EXPLORATION_PREAMBLE = """You are exploring a codebase, one tool call at a time, to understand the question below.
 
-## What You've Learned So Far
-
-Repository: {repo_path}
-
-{exploration_context}
-
-{warning_text}
 ## Available Tools
 
 {tools_text}
 
 ## Your Task
 
-Decide what to do next to understand "{user_request}".
+Decide what to do next to understand the question.
 
 Think step by step:
 1. What do I still need to understand?
@@ -45,7 +28,37 @@ the key code path, and relevant data structures), respond with:
 
 Otherwise, respond with the next tool to use:
 {{"type": "tool", "tool": "tool_name", "args": {{"arg1": "value1"}}, "reason": "why this tool"}}
+"""
+
+
+@lru_cache(maxsize=8)
+def _exploration_preamble(tools_text: str) -> str:
+    return _EXPLORATION_PREAMBLE.format(tools_text=tools_text)
+
 
+def build_exploration_prompt(
+    user_request: str,
+    repo_path: str,
+    exploration_context: str,
+    tools_text: str,
+    repeat_warning: str | None = None,
+) -> str:
+    warning_text = ""
+    if repeat_warning:
+        warning_text = f"\n## Repeat Guard\n{repeat_warning}\n"
+    # Static instructions go first so repeated calls share a cacheable prefix.
+    return _exploration_preamble(tools_text) + f"""
+## Question
+
+"{user_request}"
+
+## What You've Learned So Far
+
+Repository: {repo_path}
+
+{exploration_context}
+
+{warning_text}
 Respond with ONLY the JSON, no other text."""
 
 
@@ -1,19 +1,32 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field, asdict
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
 
+import codecs
 import json
 import os
+import queue
 import re
 import sys
 import select
+import signal
 import termios
 import textwrap
+import threading
 import tty
 
-from rich.console import Console
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+from rich.console import Console, ConsoleDimensions, ConsoleOptions
 from rich.layout import Layout
 from rich.live import Live
 from rich.markdown import Markdown
@@ -25,6 +38,63 @@ from rich.text import Text
 
 from .repo_scout.agent import CodeWalkerAgent
 
+_MAX_KEYS_PER_FRAME = 32
+_MAX_SEARCH_RESULTS = 500
+_RESOLVE_WORKERS = 4
+_ASCII_LOWER = bytes.maketrans(
+    b"ABCDEFGHIJKLMNOPQRSTUVWXYZ", b"abcdefghijklmnopqrstuvwxyz"
+)
+_KEY_MAP = {
+    "\x1b": "ESC",
+    "\x1b[A": "UP",
+    "\x1b[B": "DOWN",
+    "\x1b[C": "RIGHT",
+    "\x1b[D": "LEFT",
+    "\x1bOA": "UP",
+    "\x1bOB": "DOWN",
+    "\x1bOC": "RIGHT",
+    "\x1bOD": "LEFT",
+}
+
+_LINE_NUMBER_RE = re.compile(r"\s*(\d+)\s*\|\s?(.*)$")
+_PATH_SUFFIX_RE = re.compile(
+    r"(?:#L(\d+)(?:-L?(\d+))?|:(\d+)-(\d+)|:(\d+)(?::\d+)?)$"
+)
+_DRIVE_RE = re.compile(r"^[A-Za-z]:[\\/]")
+_DEF_LINE_RE = re.compile(r"^(?!---)(.*?):(\d+):[^\S\n]*(.*)$", re.MULTILINE)
+_CALL_RE = re.compile(r"\b([A-Za-z_][A-Za-z0-9_:]*)\s*\(")
+_SYMBOL_CALL_RE = re.compile(r"([A-Za-z_][A-Za-z0-9_:]*)\s*\(")
+_SYMBOL_WORD_RE = re.compile(r"\b([A-Za-z_][A-Za-z0-9_:]*)\b")
+_LANGUAGE_BY_EXT = {
+    ".py": "python",
+    ".go": "go",
+    ".rs": "rust",
+    ".js": "javascript",
+    ".ts": "typescript",
+    ".cc": "cpp",
+    ".cpp": "cpp",
+    ".c": "c",
+    ".h": "cpp",
+    ".java": "java",
+    ".rb": "ruby",
+}
+_CALL_KEYWORDS = frozenset(
+    {
+        "if",
+        "for",
+        "while",
+        "switch",
+        "return",
+        "catch",
+        "def",
+        "class",
+        "func",
+        "fn",
+        "sizeof",
+        "new",
+    }
+)
+
 
 @dataclass
 class UIStep:
@@ -53,8 +123,7 @@ class WalkSession:
     dive_stack: List[Tuple[int, int, int, int]] = field(default_factory=list)
 
 
-@dataclass
-class SearchResult:
+class SearchResult(NamedTuple):
     label: str
     kind: str
     step_index: Optional[int] = None
@@ -63,12 +132,37 @@ class SearchResult:
     preview: Optional[str] = None
 
 
+_UI_STEP_FIELDS = tuple(f.name for f in fields(UIStep))
+
+
+def _step_to_dict(step: UIStep) -> Dict[str, object]:
+    return {name: getattr(step, name) for name in _UI_STEP_FIELDS}
+
+
+class _RenderCache:
+    def __init__(self, renderable) -> None:
+        self.renderable = renderable
+        self._size: Optional[Tuple[int, Optional[int]]] = None
+        self._lines: List[List[Segment]] = []
+
+    def __rich_console__(self, console: Console, options: ConsoleOptions):
+        size = (options.max_width, options.height)
+        if size != self._size:
+            self._lines = console.render_lines(self.renderable, options)
+            self._size = size
+        new_line = Segment.line()
+        for line in self._lines:
+            yield from line
+            yield new_line
+
+
 def build_session(agent: CodeWalkerAgent, user_request: str) -> WalkSession:
     plan = agent.prepare_plan(user_request)
     if not plan or not plan.steps:
         raise RuntimeError("No plan available to build a TUI session.")
 
     steps: List[UIStep] = []
+    definitions: Dict[str, str] = {}
     for step in plan.steps:
         normalized_path, hint_start, _ = _normalize_file_path(step.file_path)
         if normalized_path != step.file_path:
@@ -79,7 +173,9 @@ def build_session(agent: CodeWalkerAgent, user_request: str) -> WalkSession:
         start_line = step.start_line or hint_start or inferred_start or 1
         explanation = agent.generate_step_explanation(step, cleaned_code)
         flow = agent.generate_step_flow(step, cleaned_code) if agent.flow_diagrams else ""
-        data_structures = _resolve_data_structures(agent, step.data_structures)
+        data_structures = _resolve_data_structures(
+            agent, step.data_structures, definitions
+        )
         calls = _extract_calls(cleaned_code)
 
         steps.append(
@@ -125,7 +221,10 @@ def _strip_line_numbers(code: str) -> Tuple[str, Optional[int]]:
     start_line: Optional[int] = None
     cleaned_lines: List[str] = []
     for line in lines:
-        match = re.match(r"\s*(\d+)\s*\|\s?(.*)$", line)
+        if "|" not in line:
+            cleaned_lines.append(line)
+            continue
+        match = _LINE_NUMBER_RE.match(line)
         if match:
             if start_line is None:
                 start_line = int(match.group(1))
@@ -140,73 +239,76 @@ def _normalize_file_path(path: str) -> Tuple[str, Optional[int], Optional[int]]:
     cleaned = path.strip().strip('"').strip("'")
     if cleaned.startswith("file://"):
         cleaned = cleaned[7:]
-    cleaned = os.path.expandvars(os.path.expanduser(cleaned))
-
-    hash_match = re.search(r"#L(\d+)(?:-L?(\d+))?$", cleaned)
-    if hash_match:
-        start = int(hash_match.group(1))
-        end = int(hash_match.group(2)) if hash_match.group(2) else None
-        return cleaned[: hash_match.start()].strip(), start, end
-
-    if ":" in cleaned and not re.match(r"^[A-Za-z]:[\\/]", cleaned):
-        range_match = re.search(r":(\d+)-(\d+)$", cleaned)
-        if range_match:
-            start = int(range_match.group(1))
-            end = int(range_match.group(2))
-            return cleaned[: range_match.start()].strip(), start, end
-
-        colon_match = re.search(r":(\d+)(?::\d+)?$", cleaned)
-        if colon_match:
-            start = int(colon_match.group(1))
-            return cleaned[: colon_match.start()].strip(), start, None
-
-    return cleaned, None, None
+    if cleaned.startswith("~"):
+        cleaned = os.path.expanduser(cleaned)
+    if "$" in cleaned or "%" in cleaned:
+        cleaned = os.path.expandvars(cleaned)
+
+    match = _PATH_SUFFIX_RE.search(cleaned)
+    if not match:
+        return cleaned, None, None
+    base = cleaned[: match.start()].strip()
+    hash_start, hash_end, range_start, range_end, line = match.groups()
+    if hash_start:
+        return base, int(hash_start), int(hash_end) if hash_end else None
+    if _DRIVE_RE.match(cleaned):
+        return cleaned, None, None
+    if range_start:
+        return base, int(range_start), int(range_end)
+    return base, int(line), None
 
 
 def _resolve_data_structures(
-    agent: CodeWalkerAgent, names: List[str]
+    agent: CodeWalkerAgent,
+    names: List[str],
+    definitions: Optional[Dict[str, str]] = None,
 ) -> List[Dict[str, str]]:
-    results: List[Dict[str, str]] = []
-    for name in names:
-        definition = ""
-        found = agent.tools.find_definition(name)
+    if definitions is None:
+        definitions = {}
+    missing = [name for name in dict.fromkeys(names) if name not in definitions]
+    if len(missing) > 1:
+        workers = min(_RESOLVE_WORKERS, len(missing))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            found_results = list(executor.map(agent.tools.find_definition, missing))
+    else:
+        found_results = [agent.tools.find_definition(name) for name in missing]
+    for name, found in zip(missing, found_results):
         if found.success and found.output != f"No definition found for: {name}":
-            definition = found.output
+            definitions[name] = found.output
         else:
-            definition = "Definition not found."
-        results.append({"name": name, "definition": definition})
-    return results
+            definitions[name] = "Definition not found."
+    return [{"name": name, "definition": definitions[name]} for name in names]
+
+
+def _is_symbol_query(query: str) -> bool:
+    return (
+        query.isascii()
+        and not query.startswith(":")
+        and query.replace(":", "_").isidentifier()
+    )
+
+
+def _clamp_scroll(scroll: int, total_lines: int, visible_height: int) -> int:
+    return max(0, min(scroll, total_lines - visible_height))
+
+
+@lru_cache(maxsize=256)
+def _detect_language(file_path: str) -> str:
+    return _LANGUAGE_BY_EXT.get(os.path.splitext(file_path)[1].lower(), "text")
 
 
 def _extract_calls(code: str) -> List[str]:
-    if not code:
+    if "(" not in code:
         return []
-    keywords = {
-        "if",
-        "for",
-        "while",
-        "switch",
-        "return",
-        "catch",
-        "def",
-        "class",
-        "func",
-        "fn",
-        "sizeof",
-        "new",
-    }
-    calls: List[str] = []
-    seen = set()
-    for match in re.finditer(r"\b([A-Za-z_][A-Za-z0-9_:]*)\s*\(", code):
+    calls: Dict[str, None] = {}
+    for match in _CALL_RE.finditer(code):
         name = match.group(1)
-        if name in keywords:
+        if name in _CALL_KEYWORDS or name in calls:
             continue
-        if name not in seen:
-            seen.add(name)
-            calls.append(name)
+        calls[sys.intern(name)] = None
         if len(calls) >= 12:
             break
-    return calls
+    return list(calls)
 
 
 class CodeWalkerTUI:
@@ -225,26 +327,131 @@ class CodeWalkerTUI:
         self.explain_scroll = 0
         self.status_message = ""
         self.overlay_title: Optional[str] = None
-        self.overlay_lines: List[str] = []
+        self.overlay_lines: Tuple[str, ...] = ()
         self.overlay_scroll = 0
         self.search_active = False
         self.search_query = ""
         self.search_results: List[SearchResult] = []
         self.search_selected = 0
         self.last_key = ""
+        self._dirty = False
+        self._key_queue: "queue.Queue[List[str]]" = queue.Queue()
+        self._size: Optional[ConsoleDimensions] = None
+        self._pending_input = ""
+        self._input_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._code_lines_cache: Dict[int, List[str]] = {}
+        self._search_corpus_cache: Optional[List[Tuple[str, str, bytes]]] = None
+        self._trigram_index: Dict[str, Set[int]] = {}
+        self._code_blob = b""
+        self._code_offsets: List[int] = []
+        self._search_token = 0
+        self._search_truncated = False
+        self._step_results_cache: Dict[int, SearchResult] = {}
+        self._search_executor: Optional[ThreadPoolExecutor] = None
+        self._input_thread: Optional[threading.Thread] = None
+        self._search_updates: "queue.Queue[Tuple[int, List[SearchResult]]]" = (
+            queue.Queue()
+        )
+        self._code_panel_cache: OrderedDict = OrderedDict()
+        self._explain_lines_cache: Dict[Tuple[int, int], List[Text]] = {}
+        self._breadcrumb_cache: Dict[Tuple[int, int], Panel] = {}
+        self._data_summary_cache: Dict[Tuple[int, int], Panel] = {}
+        self._overview_panel_cache: Dict[Tuple[int, int], Panel] = {}
+        self._search_panel_cache: Optional[Tuple[tuple, Panel]] = None
+        self._footer_base = Text.assemble(
+            (" [<-] ", "bold"),
+            ("Prev  ", "dim"),
+            ("[->] ", "bold"),
+            ("Next  ", "dim"),
+            ("[Tab] ", "bold"),
+            ("Focus  ", "dim"),
+            ("[d] ", "bold"),
+            ("Data  ", "dim"),
+            ("[/] ", "bold"),
+            ("Search  ", "dim"),
+            ("[q] ", "bold"),
+            ("Quit", "dim"),
+        )
+
+    def __enter__(self) -> "CodeWalkerTUI":
+        fd = sys.stdin.fileno()
+        self._saved_tty = termios.tcgetattr(fd)
+        self._saved_winch = signal.signal(signal.SIGWINCH, self._on_resize)
+        tty.setraw(fd)
+        # Raw input, but keep output post-processing so Rich's bare "\n" line
+        # breaks still return to column 0.
+        mode = termios.tcgetattr(fd)
+        mode[1] |= termios.OPOST | termios.ONLCR
+        termios.tcsetattr(fd, termios.TCSADRAIN, mode)
+        self._wake_r, self._wake_w = os.pipe()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._search_executor is not None:
+            self._search_executor.shutdown(wait=False, cancel_futures=True)
+        os.write(self._wake_w, b"\0")
+        if self._input_thread is not None:
+            self._input_thread.join(timeout=1.0)
+            self._input_thread = None
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        signal.signal(signal.SIGWINCH, self._saved_winch)
+        termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, self._saved_tty)
 
     def run(self) -> None:
-        with Live(self.render(), console=self.console, refresh_per_second=10, screen=True) as live:
+        with self, Live(
+            self.render(), console=self.console, auto_refresh=False, screen=True
+        ) as live:
+            self._input_thread = threading.Thread(
+                target=self._input_loop, daemon=True
+            )
+            self._input_thread.start()
             while True:
-                key = self._get_key()
-                if not key:
-                    continue
-                if key in ("q", "\x03"):
-                    break
-                handled = self._handle_key(key)
-                if handled == "quit":
+                try:
+                    keys = self._key_queue.get(timeout=0.1)
+                except queue.Empty:
+                    keys = []
+                quit_requested = False
+                budget = _MAX_KEYS_PER_FRAME
+                while keys:
+                    for key in keys:
+                        if self._apply_key(key) == "quit":
+                            quit_requested = True
+                            break
+                    budget -= len(keys)
+                    if quit_requested or budget <= 0:
+                        break
+                    try:
+                        keys = self._key_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                if quit_requested:
                     break
-                live.update(self.render())
+                self._apply_search_updates()
+                if self._dirty:
+                    self._dirty = False
+                    live.update(self.render(), refresh=True)
+
+    def _on_resize(self, signum, frame) -> None:
+        self._size = None
+        self._dirty = True
+
+    def _console_size(self) -> ConsoleDimensions:
+        if self._size is None:
+            self._size = self.console.size
+        return self._size
+
+    def _apply_key(self, key: str) -> Optional[str]:
+        if key in ("q", "\x03"):
+            return "quit"
+        return self._handle_key(key)
+
+    def _input_loop(self) -> None:
+        while True:
+            keys = self._get_keys()
+            if not keys:
+                return
+            self._key_queue.put(keys)
 
     # ===== Rendering =====
 
@@ -265,15 +472,16 @@ class CodeWalkerTUI:
 
         layout["header"].update(self._render_header())
 
+        size = self._console_size()
         main_height = max(
             5,
-            self.console.size.height
+            size.height
             - header_height
             - data_height
             - breadcrumb_height
             - footer_height,
         )
-        main_width = self.console.size.width
+        main_width = size.width
 
         if self.search_active:
             layout["main"].update(self._render_search_overlay(main_height, main_width))
@@ -336,24 +544,35 @@ class CodeWalkerTUI:
         )
         title.append("  |  ", style="dim")
         title.append(step.file_path, style="green")
-        max_width = max(10, self.console.size.width - 4)
+        max_width = max(10, self._console_size().width - 4)
         title.truncate(max_width, overflow="ellipsis")
         return Panel(title, style="bold")
 
-    def _render_code_panel(self, height: int, width: int) -> Panel:
+    def _render_code_panel(self, height: int, width: int) -> _RenderCache:
         step = self._current_step()
-        code_lines = step.code.splitlines() or ["(no code)"]
+        code_lines = self._code_lines() or ["(no code)"]
         visible_height = max(3, height - 2)
         self._clamp_code_scroll(len(code_lines), visible_height)
+        key = (
+            self.session.current_step,
+            self.code_scroll,
+            self.code_cursor,
+            self.focus,
+            height,
+            width,
+        )
+        cached = self._code_panel_cache.get(key)
+        if cached is not None:
+            self._code_panel_cache.move_to_end(key)
+            return cached
         visible_lines = code_lines[self.code_scroll : self.code_scroll + visible_height]
 
         start_line = step.start_line + self.code_scroll
-        highlight_line = step.start_line + self.code_cursor
-        highlight_lines = {highlight_line} if self._cursor_visible(visible_height) else set()
+        highlight_lines = {step.start_line + self.code_cursor}
 
         syntax = Syntax(
             "\n".join(visible_lines),
-            self._detect_language(step.file_path),
+            _detect_language(step.file_path),
             theme="ansi_dark",
             line_numbers=True,
             start_line=start_line,
@@ -363,12 +582,17 @@ class CodeWalkerTUI:
         )
 
         border_style = "bold green" if self.focus == "code" else "green"
-        return Panel(
+        panel = Panel(
             syntax,
             title=step.title,
             border_style=border_style,
             padding=(0, 1),
         )
+        rendered = _RenderCache(panel)
+        self._code_panel_cache[key] = rendered
+        if len(self._code_panel_cache) > 32:
+            self._code_panel_cache.popitem(last=False)
+        return rendered
 
     def _render_explanation_panel(
         self, height: int, width: int, panel_width: int
@@ -377,17 +601,16 @@ class CodeWalkerTUI:
         content_width = max(20, panel_width - 6)
         lines = self._format_explanation_lines(step, content_width)
         visible_height = max(3, height - 2)
-        self._clamp_explain_scroll(len(lines), visible_height)
+        self.explain_scroll = _clamp_scroll(
+            self.explain_scroll, len(lines), visible_height
+        )
         visible_lines = lines[self.explain_scroll : self.explain_scroll + visible_height]
 
         text = Text()
         for idx, line in enumerate(visible_lines):
             if idx:
                 text.append("\n")
-            if isinstance(line, Text):
-                text.append_text(line)
-            else:
-                text.append(str(line))
+            text.append_text(line)
         border_style = "bold blue" if self.focus == "explanation" else "blue"
         return Panel(
             text,
@@ -406,18 +629,22 @@ class CodeWalkerTUI:
                 height=height,
             )
         if not self.data_structures_expanded:
-            names = [s.get("name", "?") for s in step.data_structures]
-            return Panel(
-                Text(f"Data Structures: {', '.join(names)}", style="cyan"),
-                border_style="cyan",
-                height=height,
-            )
+            key = (self.session.current_step, height)
+            cached = self._data_summary_cache.get(key)
+            if cached is None:
+                names = [s.get("name", "?") for s in step.data_structures]
+                cached = Panel(
+                    Text(f"Data Structures: {', '.join(names)}", style="cyan"),
+                    border_style="cyan",
+                    height=height,
+                )
+                self._data_summary_cache[key] = cached
+            return cached
 
         table = Table(show_header=False, box=None, padding=(0, 1))
         for struct in step.data_structures:
             name = struct.get("name", "")
-            definition_lines = struct.get("definition", "").splitlines()
-            definition = definition_lines[0] if definition_lines else ""
+            definition = struct.get("definition", "").partition("\n")[0].rstrip("\r")
             table.add_row(Text(name, style="bold cyan"), Text(definition, style="dim"))
 
         return Panel(
@@ -428,34 +655,27 @@ class CodeWalkerTUI:
         )
 
     def _render_breadcrumb(self) -> Panel:
-        parts = []
+        key = (self.session.current_step, self._console_size().width)
+        cached = self._breadcrumb_cache.get(key)
+        if cached is not None:
+            return cached
+        text = Text("Path: ")
         for i, step in enumerate(self.session.steps):
-            name = step.title.split(":")[-1].strip()[:15]
+            name = step.title.rsplit(":", 1)[-1].strip()[:15]
+            if i:
+                text.append(" -> ")
             if i == self.session.current_step:
-                parts.append(f"[bold reverse cyan] {name} [/]")
+                text.append(f" {name} ", style="bold reverse cyan")
             else:
-                parts.append(f"[dim]{name}[/]")
-        path_text = " -> ".join(parts)
-        text = Text.from_markup(f"Path: {path_text}")
-        max_width = max(10, self.console.size.width - 4)
+                text.append(name, style="dim")
+        max_width = max(10, self._console_size().width - 4)
         text.truncate(max_width, overflow="ellipsis")
-        return Panel(text, border_style="yellow")
+        panel = Panel(text, border_style="yellow")
+        self._breadcrumb_cache[key] = panel
+        return panel
 
     def _render_footer(self) -> Panel:
-        shortcuts = Text()
-        shortcuts.append(" [<-] ", style="bold")
-        shortcuts.append("Prev  ", style="dim")
-        shortcuts.append("[->] ", style="bold")
-        shortcuts.append("Next  ", style="dim")
-        shortcuts.append("[Tab] ", style="bold")
-        shortcuts.append("Focus  ", style="dim")
-        shortcuts.append("[d] ", style="bold")
-        shortcuts.append("Data  ", style="dim")
-        shortcuts.append("[/] ", style="bold")
-        shortcuts.append("Search  ", style="dim")
-        shortcuts.append("[q] ", style="bold")
-        shortcuts.append("Quit", style="dim")
-
+        shortcuts = self._footer_base.copy()
         if self.status_message:
             shortcuts.append("  |  ", style="dim")
             shortcuts.append(self.status_message, style="yellow")
@@ -465,12 +685,16 @@ class CodeWalkerTUI:
                 f"focus={self.focus} view={self.view_mode} key={self.last_key}",
                 style="dim",
             )
-        max_width = max(10, self.console.size.width - 4)
+        max_width = max(10, self._console_size().width - 4)
         shortcuts.truncate(max_width, overflow="ellipsis")
 
         return Panel(shortcuts, style="dim")
 
     def _render_overview(self, height: int, width: int) -> Panel:
+        key = (height, width)
+        cached = self._overview_panel_cache.get(key)
+        if cached is not None:
+            return cached
         content_width = max(20, width - 6)
         lines = self._format_overview_lines(content_width)
         visible_height = max(3, height - 2)
@@ -479,15 +703,16 @@ class CodeWalkerTUI:
         for idx, line in enumerate(visible_lines):
             if idx:
                 text.append("\n")
-            if isinstance(line, Text):
-                text.append_text(line)
-            else:
-                text.append(str(line))
-        return Panel(text, title="Overview", border_style="magenta", height=height)
+            text.append_text(line)
+        panel = Panel(text, title="Overview", border_style="magenta", height=height)
+        self._overview_panel_cache[key] = panel
+        return panel
 
     def _render_overlay(self, height: int, width: int) -> Panel:
         visible_height = max(3, height - 2)
-        self._clamp_overlay_scroll(len(self.overlay_lines), visible_height)
+        self.overlay_scroll = _clamp_scroll(
+            self.overlay_scroll, len(self.overlay_lines), visible_height
+        )
         visible_lines = self.overlay_lines[
             self.overlay_scroll : self.overlay_scroll + visible_height
         ]
@@ -500,6 +725,15 @@ class CodeWalkerTUI:
         )
 
     def _render_search_overlay(self, height: int, width: int) -> Panel:
+        key = (
+            self.search_query,
+            self.search_selected,
+            len(self.search_results),
+            self._search_truncated,
+            height,
+        )
+        if self._search_panel_cache is not None and self._search_panel_cache[0] == key:
+            return self._search_panel_cache[1]
         lines = [f"Search: {self.search_query}", ""]
         if not self.search_results:
             lines.append("No results")
@@ -507,8 +741,12 @@ class CodeWalkerTUI:
             for idx, result in enumerate(self.search_results[:20]):
                 prefix = "> " if idx == self.search_selected else "  "
                 lines.append(f"{prefix}{result.label}")
+            if self._search_truncated:
+                lines.append(f"  ... (showing the first {_MAX_SEARCH_RESULTS} matches)")
         text = Text("\n".join(lines))
-        return Panel(text, title="Find Symbol", border_style="bright_cyan", height=height)
+        panel = Panel(text, title="Find Symbol", border_style="bright_cyan", height=height)
+        self._search_panel_cache = (key, panel)
+        return panel
 
     # ===== Input Handling =====
 
@@ -516,8 +754,10 @@ class CodeWalkerTUI:
         key = self._normalize_key(key)
         self.last_key = key
         if self.search_active:
+            self._dirty = True
             return self._handle_search_key(key)
         if self.overlay_title:
+            self._dirty = True
             return self._handle_overlay_key(key)
 
         if key in ("h", "LEFT"):
@@ -529,6 +769,7 @@ class CodeWalkerTUI:
         elif key in ("j", "DOWN"):
             self._scroll_down()
         elif key in ("ESC", "MOUSE"):
+            self._dirty = self._dirty or self.debug
             return None
         elif key == "g":
             self._go_to_step(0)
@@ -574,6 +815,10 @@ class CodeWalkerTUI:
             self._show_definition()
         elif key == "?":
             self._show_help()
+        else:
+            self._dirty = self._dirty or self.debug
+            return None
+        self._dirty = True
         return None
 
     def _handle_search_key(self, key: str) -> Optional[str]:
@@ -644,13 +889,14 @@ class CodeWalkerTUI:
 
     def _scroll_down(self) -> None:
         if self.focus == "code":
-            code_lines = self._current_step().code.splitlines()
+            code_lines = self._code_lines()
             if self.code_cursor < max(0, len(code_lines) - 1):
                 self.code_cursor += 1
         else:
             self.explain_scroll += 1
 
     def _open_search(self) -> None:
+        self._search_token += 1
         self.search_active = True
         self.search_query = ""
         self.search_results = []
@@ -787,52 +1033,43 @@ class CodeWalkerTUI:
             "overview_summary": self.session.overview_summary,
             "overview_flow": self.session.overview_flow,
             "overview_data_flow": self.session.overview_data_flow,
-            "steps": [asdict(step) for step in self.session.steps],
+            "steps": [_step_to_dict(step) for step in self.session.steps],
         }
-        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        if orjson is not None:
+            blob = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        else:
+            blob = json.dumps(data, indent=2).encode("utf-8")
+        path.write_bytes(blob)
         self.status_message = f"Saved {path.name}"
 
     def _export_markdown(self) -> None:
         path = Path.cwd() / "repowalk_session.md"
-        lines = [f"# {self.session.title}", ""]
-        overview_text = (
-            self.session.overview_summary or self.session.overview or ""
-        )
-        if overview_text:
-            lines.extend([overview_text, ""])
-        if self.session.overview_data_flow:
-            lines.append("Data Flow:")
-            for item in self.session.overview_data_flow:
-                lines.append(f"- {item}")
-            lines.append("")
-        if self.session.overview_flow:
-            lines.append("Flow:")
-            lines.append("```")
-            lines.append(self.session.overview_flow)
-            lines.append("```")
-            lines.append("")
-        for step in self.session.steps:
-            lines.append(f"## Step {step.step_number}: {step.title}")
-            lines.append(f"File: {step.file_path}")
-            lines.append("")
-            lines.append("```")
-            lines.append(step.code)
-            lines.append("```")
-            lines.append("")
-            if step.flow:
-                lines.append("Flow:")
-                lines.append("```")
-                lines.append(step.flow)
-                lines.append("```")
-                lines.append("")
-            lines.append(step.explanation)
-            lines.append("")
-            if step.data_structures:
-                lines.append("Data Structures:")
-                for struct in step.data_structures:
-                    lines.append(f"- {struct.get('name')}: {struct.get('definition')}")
-                lines.append("")
-        path.write_text("\n".join(lines), encoding="utf-8")
+        with path.open("w", encoding="utf-8", buffering=1 << 16) as fh:
+            fh.write(f"# {self.session.title}\n")
+            overview_text = (
+                self.session.overview_summary or self.session.overview or ""
+            )
+            if overview_text:
+                fh.write(f"\n{overview_text}\n")
+            if self.session.overview_data_flow:
+                fh.write("\nData Flow:\n")
+                fh.writelines(f"- {item}\n" for item in self.session.overview_data_flow)
+            if self.session.overview_flow:
+                fh.write(f"\nFlow:\n```\n{self.session.overview_flow}\n```\n")
+            for step in self.session.steps:
+                fh.write(
+                    f"\n## Step {step.step_number}: {step.title}\n"
+                    f"File: {step.file_path}\n\n```\n{step.code}\n```\n"
+                )
+                if step.flow:
+                    fh.write(f"\nFlow:\n```\n{step.flow}\n```\n")
+                fh.write(f"\n{step.explanation}\n")
+                if step.data_structures:
+                    fh.write("\nData Structures:\n")
+                    fh.writelines(
+                        f"- {struct.get('name')}: {struct.get('definition')}\n"
+                        for struct in step.data_structures
+                    )
         self.status_message = f"Exported {path.name}"
 
     # ===== Helpers =====
@@ -840,7 +1077,19 @@ class CodeWalkerTUI:
     def _current_step(self) -> UIStep:
         return self.session.steps[self.session.current_step]
 
+    def _code_lines(self) -> List[str]:
+        index = self.session.current_step
+        lines = self._code_lines_cache.get(index)
+        if lines is None:
+            lines = self.session.steps[index].code.splitlines()
+            self._code_lines_cache[index] = lines
+        return lines
+
     def _format_explanation_lines(self, step: UIStep, width: int) -> List[Text]:
+        key = (self.session.current_step, width)
+        cached = self._explain_lines_cache.get(key)
+        if cached is not None:
+            return cached
         content = [f"## {step.title}", ""]
         if step.flow:
             content.extend(
@@ -872,11 +1121,8 @@ class CodeWalkerTUI:
             if not line:
                 lines.append(Text(""))
                 continue
-            segments = [(seg.text, seg.style) for seg in line if isinstance(seg, Segment)]
-            if not segments:
-                lines.append(Text(""))
-                continue
-            lines.append(Text.assemble(*segments))
+            lines.append(Text.assemble(*[(seg.text, seg.style) for seg in line]))
+        self._explain_lines_cache[key] = lines
         return lines
 
     def _format_overview_lines(self, width: int) -> List[Text]:
@@ -908,71 +1154,164 @@ class CodeWalkerTUI:
             if not line:
                 lines.append(Text(""))
                 continue
-            segments = [
-                (seg.text, seg.style) for seg in line if isinstance(seg, Segment)
-            ]
-            if not segments:
-                lines.append(Text(""))
-                continue
-            lines.append(Text.assemble(*segments))
+            lines.append(Text.assemble(*[(seg.text, seg.style) for seg in line]))
         return lines
 
     def _symbol_at_cursor(self) -> Optional[str]:
-        step = self._current_step()
-        code_lines = step.code.splitlines()
+        code_lines = self._code_lines()
         if not code_lines or self.code_cursor >= len(code_lines):
             return None
         line = code_lines[self.code_cursor]
-        match = re.search(r"([A-Za-z_][A-Za-z0-9_:]*)\s*\(", line)
+        match = _SYMBOL_CALL_RE.search(line)
         if match:
             return match.group(1)
-        match = re.search(r"\b([A-Za-z_][A-Za-z0-9_:]*)\b", line)
+        match = _SYMBOL_WORD_RE.search(line)
         if match:
             return match.group(1)
         return None
 
     def _find_step_by_symbol(self, symbol: str) -> Optional[int]:
         symbol_lower = symbol.lower()
-        for idx, step in enumerate(self.session.steps):
-            if symbol_lower in step.title.lower():
+        for idx, (title_lower, _, _) in enumerate(self._search_corpus()):
+            if symbol_lower in title_lower:
                 return idx
         return None
 
+    def _search_corpus(self) -> List[Tuple[str, str, bytes]]:
+        if self._search_corpus_cache is None:
+            corpus: List[Tuple[str, str, bytes]] = []
+            index: Dict[str, Set[int]] = {}
+            for idx, step in enumerate(self.session.steps):
+                title_lower = step.title.lower()
+                path_lower = step.file_path.lower()
+                if step.code.isascii():
+                    code_bytes = step.code.encode("ascii").translate(_ASCII_LOWER)
+                    code_lower = code_bytes.decode("ascii")
+                else:
+                    code_lower = step.code.lower()
+                    code_bytes = code_lower.encode("utf-8", "surrogatepass")
+                grams: Set[str] = set()
+                for text in (title_lower, path_lower, code_lower):
+                    grams.update(text[i : i + 3] for i in range(len(text) - 2))
+                for gram in grams:
+                    index.setdefault(gram, set()).add(idx)
+                corpus.append((title_lower, path_lower, code_bytes))
+            self._search_corpus_cache = corpus
+            self._trigram_index = index
+            offsets: List[int] = []
+            position = 0
+            for _, _, code_bytes in corpus:
+                offsets.append(position)
+                position += len(code_bytes) + 1
+            self._code_blob = b"\0".join(code_bytes for _, _, code_bytes in corpus)
+            self._code_offsets = offsets
+        return self._search_corpus_cache
+
+    def _code_hits(self, query_bytes: bytes) -> Set[int]:
+        self._search_corpus()
+        blob = self._code_blob
+        offsets = self._code_offsets
+        hits: Set[int] = set()
+        pos = blob.find(query_bytes)
+        while pos != -1:
+            idx = bisect_right(offsets, pos) - 1
+            hits.add(idx)
+            if idx + 1 >= len(offsets):
+                break
+            pos = blob.find(query_bytes, offsets[idx + 1])
+        return hits
+
+    def _search_candidates(self, query_lower: str) -> Iterable[int]:
+        self._search_corpus()
+        if len(query_lower) < 3:
+            return range(len(self.session.steps))
+        candidates: Optional[Set[int]] = None
+        for i in range(len(query_lower) - 2):
+            postings = self._trigram_index.get(query_lower[i : i + 3])
+            if not postings:
+                return ()
+            candidates = set(postings) if candidates is None else candidates & postings
+            if not candidates:
+                return ()
+        return sorted(candidates or ())
+
     def _perform_search(self) -> None:
+        self._search_token += 1
+        self._search_panel_cache = None
+        self._search_truncated = False
         query = self.search_query.strip()
         results: List[SearchResult] = []
         if query:
             query_lower = query.lower()
-            for idx, step in enumerate(self.session.steps):
+            query_bytes = query_lower.encode("utf-8", "surrogatepass")
+            corpus = self._search_corpus()
+            code_hits = self._code_hits(query_bytes) if len(query_lower) < 3 else None
+            for idx in self._search_candidates(query_lower):
+                title_lower, path_lower, code_bytes = corpus[idx]
                 if (
-                    query_lower in step.title.lower()
-                    or query_lower in step.file_path.lower()
-                    or query_lower in step.code.lower()
-                ):
-                    results.append(
-                        SearchResult(
-                            label=f"Step {step.step_number}: {step.title}",
-                            kind="step",
-                            step_index=idx,
-                        )
+                    query_lower in title_lower
+                    or query_lower in path_lower
+                    or (
+                        idx in code_hits
+                        if code_hits is not None
+                        else query_bytes in code_bytes
                     )
-            if re.match(r"^[A-Za-z_][A-Za-z0-9_:]*$", query):
-                result = self.agent.tools.find_definition(query)
-                if result.success:
-                    results.extend(self._parse_definition_results(query, result.output))
+                ):
+                    results.append(self._step_search_result(idx))
+                    if len(results) >= _MAX_SEARCH_RESULTS:
+                        self._search_truncated = True
+                        break
+            if _is_symbol_query(query):
+                if self._search_executor is None:
+                    self._search_executor = ThreadPoolExecutor(max_workers=1)
+                self._search_executor.submit(
+                    self._lookup_definitions, self._search_token, query
+                )
         self.search_results = results
         self.search_selected = 0
 
+    def _step_search_result(self, idx: int) -> SearchResult:
+        result = self._step_results_cache.get(idx)
+        if result is None:
+            step = self.session.steps[idx]
+            result = SearchResult(
+                label=f"Step {step.step_number}: {step.title}",
+                kind="step",
+                step_index=idx,
+            )
+            self._step_results_cache[idx] = result
+        return result
+
+    def _lookup_definitions(self, token: int, query: str) -> None:
+        if token != self._search_token:
+            return
+        result = self.agent.tools.find_definition(query)
+        if token != self._search_token or not result.success:
+            return
+        self._search_updates.put(
+            (token, self._parse_definition_results(query, result.output))
+        )
+
+    def _apply_search_updates(self) -> None:
+        while True:
+            try:
+                token, results = self._search_updates.get_nowait()
+            except queue.Empty:
+                return
+            room = _MAX_SEARCH_RESULTS - len(self.search_results)
+            if token == self._search_token and self.search_active and results:
+                if len(results) > room:
+                    results = results[: max(0, room)]
+                    self._search_truncated = True
+                self.search_results.extend(results)
+                self._search_panel_cache = None
+                self._dirty = True
+
     def _parse_definition_results(
         self, symbol: str, output: str
     ) -> List[SearchResult]:
         results: List[SearchResult] = []
-        for line in output.splitlines():
-            if not line or line.startswith("---"):
-                continue
-            match = re.match(r"^(.*?):(\d+):\s*(.*)$", line)
-            if not match:
-                continue
+        for match in _DEF_LINE_RE.finditer(output):
             file_path = match.group(1)
             line_number = int(match.group(2))
             preview = match.group(3).strip()
@@ -988,49 +1327,63 @@ class CodeWalkerTUI:
             )
         return results
 
-    def _detect_language(self, file_path: str) -> str:
-        ext_map = {
-            ".py": "python",
-            ".go": "go",
-            ".rs": "rust",
-            ".js": "javascript",
-            ".ts": "typescript",
-            ".cc": "cpp",
-            ".cpp": "cpp",
-            ".c": "c",
-            ".h": "cpp",
-            ".java": "java",
-            ".rb": "ruby",
-        }
-        for ext, lang in ext_map.items():
-            if file_path.endswith(ext):
-                return lang
-        return "text"
+    def _get_keys(self) -> List[str]:
+        keys: List[str] = []
+        key = self._get_key()
+        while key:
+            keys.append(key)
+            if not self._pending_input:
+                ready, _, _ = select.select([sys.stdin], [], [], 0)
+                if not ready:
+                    break
+            key = self._get_key()
+        return keys
 
     def _get_key(self) -> str:
+        if not self._pending_input:
+            self._pending_input = self._read_input()
+            if not self._pending_input:
+                return ""
+        pending = self._pending_input
+        if pending[0] != "\x1b":
+            self._pending_input = pending[1:]
+            return pending[0]
+        end = 1
+        while end < 12:
+            if end >= len(pending):
+                ready, _, _ = select.select([sys.stdin], [], [], 0.02)
+                if not ready:
+                    break
+                more = self._read_input()
+                if not more:
+                    break
+                pending += more
+            nxt = pending[end]
+            end += 1
+            if nxt.isalpha() or nxt == "~":
+                break
+        self._pending_input = pending[end:]
+        return pending[:end]
+
+    def _read_input(self) -> str:
         fd = sys.stdin.fileno()
-        old_settings = termios.tcgetattr(fd)
-        try:
-            tty.setraw(fd)
-            ch = sys.stdin.read(1)
-            if ch == "\x1b":
-                seq = ch
-                while True:
-                    ready, _, _ = select.select([sys.stdin], [], [], 0.02)
-                    if not ready:
-                        break
-                    nxt = sys.stdin.read(1)
-                    seq += nxt
-                    if nxt.isalpha() or nxt == "~":
-                        break
-                    if len(seq) >= 12:
-                        break
-                return seq
-            return ch
-        finally:
-            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+        while True:
+            ready, _, _ = select.select([fd, self._wake_r], [], [])
+            if self._wake_r in ready:
+                return ""
+            data = os.read(fd, 64)
+            if not data:
+                return ""
+            text = self._input_decoder.decode(data)
+            if text:
+                return text
 
     def _normalize_key(self, key: str) -> str:
+        mapped = _KEY_MAP.get(key)
+        if mapped is not None:
+            return mapped
+        if not key.startswith("\x1b"):
+            return key
         if key.startswith("\x1b[") or key.startswith("\x1bO"):
             last = key[-1]
             if last == "A":
@@ -1042,50 +1395,25 @@ class CodeWalkerTUI:
             if last == "D":
                 return "LEFT"
             return "ESC"
-        if key.startswith("\x1b"):
-            if "[<" in key or "M" in key:
-                return "MOUSE"
-            return "ESC"
-        return key
-
-    def _cursor_visible(self, visible_height: int) -> bool:
-        return self.code_cursor >= self.code_scroll and self.code_cursor < (
-            self.code_scroll + visible_height
-        )
+        if "[<" in key or "M" in key:
+            return "MOUSE"
+        return "ESC"
 
     def _clamp_code_scroll(self, total_lines: int, visible_height: int) -> None:
+        cursor = min(self.code_cursor, max(0, total_lines - 1))
+        self.code_cursor = cursor
         if total_lines <= visible_height:
             self.code_scroll = 0
-            self.code_cursor = min(self.code_cursor, max(0, total_lines - 1))
             return
-        if self.code_cursor < self.code_scroll:
-            self.code_scroll = self.code_cursor
-        if self.code_cursor >= self.code_scroll + visible_height:
-            self.code_scroll = self.code_cursor - visible_height + 1
-        self.code_scroll = max(0, min(self.code_scroll, total_lines - visible_height))
-
-    def _clamp_explain_scroll(self, total_lines: int, visible_height: int) -> None:
-        if total_lines <= visible_height:
-            self.explain_scroll = 0
-            return
-        self.explain_scroll = max(
-            0, min(self.explain_scroll, total_lines - visible_height)
-        )
-
-    def _clamp_overlay_scroll(self, total_lines: int, visible_height: int) -> None:
-        if total_lines <= visible_height:
-            self.overlay_scroll = 0
-            return
-        self.overlay_scroll = max(
-            0, min(self.overlay_scroll, total_lines - visible_height)
-        )
+        scroll = max(min(self.code_scroll, cursor), cursor - visible_height + 1)
+        self.code_scroll = _clamp_scroll(scroll, total_lines, visible_height)
 
     def _set_overlay(self, title: str, lines: List[str]) -> None:
         self.overlay_title = title
-        self.overlay_lines = lines or ["(empty)"]
+        self.overlay_lines = tuple(lines) or ("(empty)",)
         self.overlay_scroll = 0
 
     def _clear_overlay(self) -> None:
         self.overlay_title = None
-        self.overlay_lines = []
+        self.overlay_lines = ()
         self.overlay_scroll = 0
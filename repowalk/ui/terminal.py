@@ -5,7 +5,10 @@ import os
 import re
 import sys
 import textwrap
+from array import array
+from collections import OrderedDict
 from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
 from concurrent.futures import Future, ThreadPoolExecutor
 
@@ -32,6 +35,44 @@ COLOR_SYNTAX_STRING = 7
 COLOR_SYNTAX_COMMENT = 8
 COLOR_SYNTAX_NUMBER = 9
 
+_TEXT_LEXER = TextLexer()
+_CODE_CACHE_SIZE = 16
+_EXPLAIN_CACHE_SIZE = 32
+_LEX_CACHE_SIZE = 64
+_MAX_OVERLAY_LINES = 2000
+_BREADCRUMB_RADIUS = 5
+_SEARCH_DEBOUNCE_MS = 40
+_MAX_KEYS_PER_FRAME = 32
+_WRAP_WHITESPACE = str.maketrans("\n\r\x0b\x0c", "    ")
+_FOOTER_PARTS = (
+    "[<-] Prev",
+    "[->] Next",
+    "[Tab] Focus",
+    "[d] Data",
+    "[/] Search",
+    "[?] Ask",
+    "[Enter] Send",
+    "[Esc] Cancel",
+    "[c] Clear",
+    "[q] Quit",
+)
+
+_QUERY_IDENT_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_:]*$")
+_DEF_LINE_RE = re.compile(r"^(.*?):(\d+):\s*(.*)$")
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+_LIST_ITEM_RE = re.compile(r"^(\s*(?:[-*+]|\d+\.)\s+)(.*)$")
+_SYMBOL_CALL_RE = re.compile(r"([A-Za-z_][A-Za-z0-9_:]*)\s*\(")
+_SYMBOL_WORD_RE = re.compile(r"\b([A-Za-z_][A-Za-z0-9_:]*)\b")
+_INLINE_MARKDOWN_RES = (
+    ("`", re.compile(r"`([^`]+)`")),
+    ("*", re.compile(r"\*\*([^*]+)\*\*")),
+    ("_", re.compile(r"__([^_]+)__")),
+    ("*", re.compile(r"\*([^*]+)\*")),
+    ("_", re.compile(r"_([^_]+)_")),
+    ("[", re.compile(r"\[([^\]]+)\]\([^)]+\)")),
+)
+_LEX_CACHE: OrderedDict = OrderedDict()
+
 
 @dataclass
 class SearchResult:
@@ -58,7 +99,11 @@ class UIState:
     code_scroll: int = 0
     code_cursor: int = 0
     explain_scroll: int = 0
-    code_cache: dict = field(default_factory=dict)
+    code_cache: OrderedDict = field(default_factory=OrderedDict)
+    explain_cache: OrderedDict = field(default_factory=OrderedDict)
+    breadcrumb_cache: Optional[Tuple[tuple, str]] = None
+    header_cache: Optional[Tuple[tuple, str]] = None
+    footer_cache: Optional[Tuple[tuple, str]] = None
     overlay_title: Optional[str] = None
     overlay_lines: List[str] = field(default_factory=list)
     overlay_scroll: int = 0
@@ -66,6 +111,9 @@ class UIState:
     search_query: str = ""
     search_results: List[SearchResult] = field(default_factory=list)
     search_selected: int = 0
+    search_pending: bool = False
+    search_index: List[Tuple[str, str, str]] = field(default_factory=list)
+    search_index_steps: Optional[List[UIStep]] = None
     status_message: str = ""
     last_key: str = ""
     qa_mode: bool = False
@@ -77,6 +125,7 @@ class UIState:
     qa_future: Optional[Future] = None
     qa_pending_question: Optional[str] = None
     current_step_id: Optional[int] = None
+    last_render_key: Optional[tuple] = None
 
     def current_step(self) -> UIStep:
         return self.session.steps[self.session.current_step]
@@ -124,35 +173,29 @@ def _run_ui(
     state.executor = executor
 
     while True:
-        step_id = state.session.current_step
-        if state.current_step_id != step_id:
-            state.current_step_id = step_id
-            state.qa_history = []
-            state.qa_response = ""
-            state.qa_input = ""
-            state.qa_cursor = 0
-            state.qa_mode = False
-            state.qa_future = None
-            state.qa_loading = False
-            state.qa_pending_question = None
+        _sync_step(state)
 
-        stdscr.erase()
         height, width = stdscr.getmaxyx()
+        render_key = _render_key(state, height, width)
+        if render_key != state.last_render_key:
+            state.last_render_key = render_key
+            stdscr.erase()
+            if height < 12 or width < 50:
+                _safe_addstr(
+                    stdscr,
+                    0,
+                    0,
+                    "Terminal too small. Resize to at least 50x12.",
+                )
+            else:
+                _render_screen(stdscr, state, height, width)
+            stdscr.refresh()
 
-        if height < 12 or width < 50:
-            _safe_addstr(
-                stdscr,
-                0,
-                0,
-                "Terminal too small. Resize to at least 50x12.",
-            )
-        else:
-            _render_screen(stdscr, state, height, width)
-
-        stdscr.refresh()
-
+        stdscr.timeout(_SEARCH_DEBOUNCE_MS if state.search_pending else 100)
         key = stdscr.getch()
         if key == -1:
+            if state.search_pending:
+                _flush_search(state)
             if state.qa_loading and state.qa_future and state.qa_future.done():
                 response = state.qa_future.result()
                 state.qa_loading = False
@@ -178,10 +221,69 @@ def _run_ui(
                 }
             )
             state.qa_pending_question = None
-        if not _handle_key(state, key):
+        if not _handle_key(state, key) or not _drain_keys(stdscr, state):
             break
 
 
+def _sync_step(state: UIState) -> None:
+    step_id = state.session.current_step
+    if state.current_step_id != step_id:
+        state.current_step_id = step_id
+        state.qa_history = []
+        state.qa_response = ""
+        state.qa_input = ""
+        state.qa_cursor = 0
+        state.qa_mode = False
+        state.qa_future = None
+        state.qa_loading = False
+        state.qa_pending_question = None
+
+
+def _drain_keys(stdscr, state: UIState) -> bool:
+    stdscr.nodelay(True)
+    try:
+        for _ in range(_MAX_KEYS_PER_FRAME):
+            key = stdscr.getch()
+            if key == -1:
+                break
+            _sync_step(state)
+            if not _handle_key(state, key):
+                return False
+    finally:
+        stdscr.nodelay(False)
+    return True
+
+
+def _render_key(state: UIState, height: int, width: int) -> tuple:
+    return (
+        height,
+        width,
+        state.session.current_step,
+        state.focus,
+        state.view_mode,
+        state.split_ratio,
+        state.data_structures_expanded,
+        state.show_breadcrumb,
+        state.code_scroll,
+        state.code_cursor,
+        state.explain_scroll,
+        state.overlay_title,
+        state.overlay_scroll,
+        state.overlay_lines,
+        state.search_active,
+        state.search_query,
+        state.search_selected,
+        state.search_results,
+        state.status_message,
+        state.last_key if state.debug else "",
+        state.qa_mode,
+        state.qa_input,
+        state.qa_cursor,
+        state.qa_response,
+        state.qa_loading,
+    )
+
+
 def _init_colors() -> None:
     curses.start_color()
     curses.use_default_colors()
@@ -261,34 +363,38 @@ def _render_screen(stdscr, state: UIState, height: int, width: int) -> None:
 
 def _render_header(stdscr, state: UIState, y: int, width: int) -> None:
     step = state.current_step()
-    title = (
-        f"Code Walker | Step {state.session.current_step + 1}"
-        f"/{len(state.session.steps)} | {step.file_path}"
-    )
+    current = state.session.current_step
+    total = len(state.session.steps)
+    cache_key = (current, total, step.file_path, width)
+    cached = state.header_cache
+    if cached is not None and cached[0] == cache_key:
+        title = cached[1]
+    else:
+        title = _truncate(
+            f"Code Walker | Step {current + 1}/{total} | {step.file_path}",
+            width,
+        )
+        state.header_cache = (cache_key, title)
     _fill_line(stdscr, y, width, curses.color_pair(COLOR_HEADER))
-    _safe_addstr(stdscr, y, 0, _truncate(title, width), curses.color_pair(COLOR_HEADER))
+    _safe_addstr(stdscr, y, 0, title, curses.color_pair(COLOR_HEADER))
 
 
 def _render_footer(stdscr, state: UIState, y: int, width: int) -> None:
-    parts = [
-        "[<-] Prev",
-        "[->] Next",
-        "[Tab] Focus",
-        "[d] Data",
-        "[/] Search",
-        "[?] Ask",
-        "[Enter] Send",
-        "[Esc] Cancel",
-        "[c] Clear",
-        "[q] Quit",
-    ]
-    if state.status_message:
-        parts.append(f"| {state.status_message}")
-    if state.debug and state.last_key:
-        parts.append(f"| key={state.last_key}")
-    line = "  ".join(parts)
+    debug_key = state.last_key if state.debug else ""
+    cache_key = (state.status_message, debug_key, width)
+    cached = state.footer_cache
+    if cached is not None and cached[0] == cache_key:
+        line = cached[1]
+    else:
+        parts = _FOOTER_PARTS
+        if state.status_message:
+            parts += (f"| {state.status_message}",)
+        if debug_key:
+            parts += (f"| key={debug_key}",)
+        line = _truncate("  ".join(parts), width)
+        state.footer_cache = (cache_key, line)
     _fill_line(stdscr, y, width, curses.A_DIM)
-    _safe_addstr(stdscr, y, 0, _truncate(line, width), curses.A_DIM)
+    _safe_addstr(stdscr, y, 0, line, curses.A_DIM)
 
 
 def _render_main(
@@ -343,7 +449,7 @@ def _render_code_panel(
     for row, idx in enumerate(range(line_start, line_end)):
         line_no = step.start_line + idx
         prefix = f"{line_no:4d} | "
-        segments = line_segments[idx] if idx < len(line_segments) else []
+        segments = line_segments.get(idx)
         if not segments:
             segments = [(code_lines[idx], curses.A_NORMAL)]
         rendered_segments = [(prefix, curses.A_DIM)] + segments
@@ -374,7 +480,11 @@ def _render_explanation_panel(
         focused=state.focus == "explanation",
     )
     content_width = max(10, width - 2)
-    lines = _format_explanation(step, content_width)
+    cache_key = (state.session.current_step, content_width)
+    lines = _cache_get(state.explain_cache, cache_key)
+    if lines is None:
+        lines = _format_explanation(step, content_width)
+        _cache_put(state.explain_cache, cache_key, lines, _EXPLAIN_CACHE_SIZE)
     visible_h = max(1, height - 2)
     _clamp_explain_scroll(state, len(lines), visible_h)
 
@@ -420,23 +530,36 @@ def _render_data_structures(
             break
         name = struct.get("name", "Unknown")
         definition = struct.get("definition", "")
-        first_line = definition.splitlines()[0] if definition else ""
+        first_line = definition.partition("\n")[0].rstrip("\r")
         line = f"{name}: {first_line}"
         _safe_addstr(stdscr, row, 1, _truncate(line, width - 2))
         row += 1
 
 
 def _render_breadcrumb(stdscr, state: UIState, y: int, width: int) -> None:
-    parts = []
-    for idx, step in enumerate(state.session.steps):
-        name = step.title.split(":")[-1].strip()[:15]
-        if idx == state.session.current_step:
-            parts.append(f"[{name}]")
-        else:
-            parts.append(name)
-    line = " -> ".join(parts)
+    current = state.session.current_step
+    cache_key = (current, width)
+    cached = state.breadcrumb_cache
+    if cached is not None and cached[0] == cache_key:
+        text = cached[1]
+    else:
+        steps = state.session.steps
+        start = max(0, current - _BREADCRUMB_RADIUS)
+        end = min(len(steps), current + _BREADCRUMB_RADIUS + 1)
+        parts = ["..."] if start > 0 else []
+        for idx in range(start, end):
+            name = steps[idx].title.split(":")[-1].strip()[:15]
+            if idx == current:
+                parts.append(f"[{name}]")
+            else:
+                parts.append(name)
+        if end < len(steps):
+            parts.append("...")
+        line = " -> ".join(parts)
+        text = _truncate(f"Path: {line}", width)
+        state.breadcrumb_cache = (cache_key, text)
     _fill_line(stdscr, y, width, curses.A_DIM)
-    _safe_addstr(stdscr, y, 0, _truncate(f"Path: {line}", width))
+    _safe_addstr(stdscr, y, 0, text)
 
 
 def _render_overview(
@@ -451,7 +574,7 @@ def _render_overview(
         nonlocal row
         if row >= max_row:
             return
-        wrapped = textwrap.wrap(line, width=content_width) or [line]
+        wrapped = _fast_wrap(line, content_width) or [line]
         for item in wrapped:
             if row >= max_row:
                 break
@@ -543,7 +666,7 @@ def _render_qa_response(
     lines = state.qa_response.splitlines()
     wrapped: List[str] = []
     for line in lines:
-        wrapped.extend(textwrap.wrap(line, width=max(10, width - 2)) or [""])
+        wrapped.extend(_fast_wrap(line, max(10, width - 2)) or [""])
     for i, line in enumerate(wrapped[: max(0, height - 2)]):
         _safe_addstr(stdscr, y + 1 + i, 1, _truncate(line, width - 2))
 
@@ -651,10 +774,13 @@ def _handle_key(state: UIState, key: int) -> bool:
 def _handle_search_key(state: UIState, key: int) -> None:
     if key in (27,):
         state.search_active = False
+        state.search_pending = False
         state.search_query = ""
         state.search_results = []
         return
     if key in (10, 13):
+        if state.search_pending:
+            _flush_search(state)
         if state.search_results:
             _activate_search_result(state)
         else:
@@ -672,6 +798,11 @@ def _handle_search_key(state: UIState, key: int) -> None:
         return
     elif 32 <= key <= 126:
         state.search_query += chr(key)
+    state.search_pending = True
+
+
+def _flush_search(state: UIState) -> None:
+    state.search_pending = False
     state.search_results = _perform_search(state)
     state.search_selected = 0
 
@@ -738,7 +869,7 @@ def _handle_qa_input(state: UIState, key: int) -> Optional[str]:
 
 def _build_tutor_context(state: UIState) -> TutorContext:
     step = state.current_step()
-    code_lines = step.code.splitlines()
+    code_lines = _get_code_render(state, step)[0]
     end_line = step.start_line + max(0, len(code_lines) - 1)
     overview_text = state.session.overview_summary or state.session.overview or ""
     if state.session.overview_flow:
@@ -780,7 +911,7 @@ def _scroll_up(state: UIState) -> None:
 
 def _scroll_down(state: UIState) -> None:
     if state.focus == "code":
-        code_lines = state.current_step().code.splitlines()
+        code_lines = _get_code_render(state, state.current_step())[0]
         if state.code_cursor < max(0, len(code_lines) - 1):
             state.code_cursor += 1
     else:
@@ -885,6 +1016,9 @@ def _show_help(state: UIState) -> None:
 
 
 def _set_overlay(state: UIState, title: str, lines: List[str]) -> None:
+    if len(lines) > _MAX_OVERLAY_LINES:
+        hidden = len(lines) - _MAX_OVERLAY_LINES
+        lines = lines[:_MAX_OVERLAY_LINES] + [f"... ({hidden} more lines)"]
     state.overlay_title = title
     state.overlay_lines = lines or ["(empty)"]
     state.overlay_scroll = 0
@@ -896,12 +1030,10 @@ def _perform_search(state: UIState) -> List[SearchResult]:
     if not query:
         return results
     query_lower = query.lower()
-    for idx, step in enumerate(state.session.steps):
-        if (
-            query_lower in step.title.lower()
-            or query_lower in step.file_path.lower()
-            or query_lower in step.code.lower()
-        ):
+    steps = state.session.steps
+    for idx, (title, path, code) in enumerate(_search_index(state)):
+        if query_lower in title or query_lower in path or query_lower in code:
+            step = steps[idx]
             results.append(
                 SearchResult(
                     label=f"Step {step.step_number}: {step.title}",
@@ -909,19 +1041,30 @@ def _perform_search(state: UIState) -> List[SearchResult]:
                     step_index=idx,
                 )
             )
-    if re.match(r"^[A-Za-z_][A-Za-z0-9_:]*$", query):
+    if _QUERY_IDENT_RE.match(query):
         result = state.agent.tools.find_definition(query)
         if result.success:
             results.extend(_parse_definition_results(query, result.output))
     return results
 
 
+def _search_index(state: UIState) -> List[Tuple[str, str, str]]:
+    steps = state.session.steps
+    if state.search_index_steps is not steps or len(state.search_index) != len(steps):
+        state.search_index = [
+            (step.title.lower(), step.file_path.lower(), step.code.lower())
+            for step in steps
+        ]
+        state.search_index_steps = steps
+    return state.search_index
+
+
 def _parse_definition_results(symbol: str, output: str) -> List[SearchResult]:
     results: List[SearchResult] = []
     for line in output.splitlines():
         if not line or line.startswith("---"):
             continue
-        match = re.match(r"^(.*?):(\d+):\s*(.*)$", line)
+        match = _DEF_LINE_RE.match(line)
         if not match:
             continue
         file_path = match.group(1)
@@ -974,19 +1117,19 @@ def _format_explanation(step: UIStep, width: int) -> List[Tuple[str, int]]:
         if not stripped:
             lines.append(("", normal_attr))
             continue
-        heading_match = re.match(r"^(#{1,6})\s+(.*)$", line.lstrip())
+        heading_match = _HEADING_RE.match(line.lstrip())
         if heading_match:
             text = _strip_inline_markdown(heading_match.group(2))
-            wrapped = textwrap.wrap(text, width=width)
+            wrapped = _fast_wrap(text, width)
             for item in wrapped if wrapped else [text]:
                 lines.append((item, heading_attr))
             continue
-        list_match = re.match(r"^(\s*(?:[-*+]|\d+\.)\s+)(.*)$", line)
+        list_match = _LIST_ITEM_RE.match(line)
         if list_match:
             prefix = list_match.group(1)
             body = _strip_inline_markdown(list_match.group(2))
             wrap_width = max(10, width - len(prefix))
-            wrapped = textwrap.wrap(body, width=wrap_width)
+            wrapped = _fast_wrap(body, wrap_width)
             if not wrapped:
                 lines.append((prefix.rstrip(), normal_attr))
             else:
@@ -995,51 +1138,96 @@ def _format_explanation(step: UIStep, width: int) -> List[Tuple[str, int]]:
                     lines.append((" " * len(prefix) + cont, normal_attr))
             continue
         text = _strip_inline_markdown(line)
-        wrapped = textwrap.wrap(text, width=width)
+        wrapped = _fast_wrap(text, width)
         for item in wrapped if wrapped else [text]:
             lines.append((item, normal_attr))
     return lines
 
 
-def _get_code_render(
-    state: UIState, step: UIStep
-) -> Tuple[List[str], List[List[Tuple[str, int]]]]:
-    cache_key = state.session.current_step
-    cached = state.code_cache.get(cache_key)
-    if cached:
+def _get_code_render(state: UIState, step: UIStep) -> Tuple[List[str], _LexedLines]:
+    cache_key = (step.file_path, step.code)
+    cached = _cache_get(state.code_cache, cache_key)
+    if cached is not None:
         return cached
 
     code_text = step.code.replace("\t", "    ")
     code_lines = code_text.splitlines() or ["(no code)"]
-    line_segments = _lex_code_lines(code_text, step.file_path)
-
-    if len(line_segments) < len(code_lines):
-        line_segments.extend([[] for _ in range(len(code_lines) - len(line_segments))])
-
-    state.code_cache[cache_key] = (code_lines, line_segments)
-    return code_lines, line_segments
-
-
-def _lex_code_lines(code: str, file_path: str) -> List[List[Tuple[str, int]]]:
-    lexer = _get_lexer(file_path)
-    tokens = lex(code, lexer)
-    lines: List[List[Tuple[str, int]]] = [[]]
-    for ttype, value in tokens:
-        attr = _token_attr(ttype)
-        parts = value.split("\n")
-        for idx, part in enumerate(parts):
-            if part:
-                lines[-1].append((part, attr))
-            if idx < len(parts) - 1:
-                lines.append([])
-    return lines
+    line_segments = _lex_code_lines(code_text, _get_lexer(step.file_path))
+
+    rendered = (code_lines, line_segments)
+    _cache_put(state.code_cache, cache_key, rendered, _CODE_CACHE_SIZE)
+    return rendered
+
+
+class _LexedLines:
+    def __init__(self, code: str, lexer) -> None:
+        self._tokens = lex(code, lexer)
+        self._done = False
+        self.texts: List[List[str]] = [[]]
+        self.attrs: List[array] = [array("L")]
+
+    def get(self, index: int) -> List[Tuple[str, int]]:
+        texts = self.texts
+        attrs = self.attrs
+        while not self._done and len(texts) <= index + 1:
+            token = next(self._tokens, None)
+            if token is None:
+                self._done = True
+                break
+            ttype, value = token
+            attr = _token_attr(ttype)
+            parts = value.split("\n")
+            last = len(parts) - 1
+            for idx, part in enumerate(parts):
+                if part:
+                    line_texts = texts[-1]
+                    line_attrs = attrs[-1]
+                    if line_attrs and line_attrs[-1] == attr:
+                        line_texts[-1] += part
+                    else:
+                        line_texts.append(part)
+                        line_attrs.append(attr)
+                if idx < last:
+                    texts.append([])
+                    attrs.append(array("L"))
+        if index >= len(texts):
+            return []
+        return list(zip(texts[index], attrs[index]))
+
+
+def _lex_code_lines(code: str, lexer) -> _LexedLines:
+    cache_key = (id(lexer), code)
+    cached = _cache_get(_LEX_CACHE, cache_key)
+    if cached is not None:
+        return cached
+    lexed = _LexedLines(code, lexer)
+    _cache_put(_LEX_CACHE, cache_key, lexed, _LEX_CACHE_SIZE)
+    return lexed
+
+
+def _cache_get(cache: OrderedDict, key):
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+
+def _cache_put(cache: OrderedDict, key, value, limit: int) -> None:
+    cache[key] = value
+    while len(cache) > limit:
+        cache.popitem(last=False)
 
 
 def _get_lexer(file_path: str):
+    return _lexer_for_name(os.path.basename(file_path))
+
+
+@lru_cache(maxsize=256)
+def _lexer_for_name(file_name: str):
     try:
-        return get_lexer_for_filename(file_path)
+        return get_lexer_for_filename(file_name)
     except ClassNotFound:
-        return TextLexer()
+        return _TEXT_LEXER
 
 
 def _token_attr(ttype) -> int:
@@ -1057,39 +1245,89 @@ def _token_attr(ttype) -> int:
 def _render_segments(
     win, y: int, x: int, segments: List[Tuple[str, int]], max_width: int, extra_attr: int
 ) -> None:
-    remaining = max_width
+    max_y, max_x = win.getmaxyx()
+    if y < 0 or y >= max_y or x < 0:
+        return
+    remaining = min(max_width, max_x - x)
+    addnstr = win.addnstr
     cursor_x = x
     for text, attr in segments:
         if remaining <= 0:
             break
         if not text:
             continue
-        chunk = text if len(text) <= remaining else text[:remaining]
-        _safe_addstr(win, y, cursor_x, chunk, attr | extra_attr)
-        cursor_x += len(chunk)
-        remaining -= len(chunk)
+        try:
+            addnstr(y, cursor_x, text, remaining, attr | extra_attr)
+        except curses.error:
+            pass
+        used = len(text)
+        if used > remaining:
+            used = remaining
+        cursor_x += used
+        remaining -= used
 
 
 def _strip_inline_markdown(text: str) -> str:
-    text = re.sub(r"`([^`]+)`", r"\1", text)
-    text = re.sub(r"\*\*([^*]+)\*\*", r"\1", text)
-    text = re.sub(r"__([^_]+)__", r"\1", text)
-    text = re.sub(r"\*([^*]+)\*", r"\1", text)
-    text = re.sub(r"_([^_]+)_", r"\1", text)
-    text = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", text)
+    for marker, pattern in _INLINE_MARKDOWN_RES:
+        if marker in text:
+            text = pattern.sub(r"\1", text)
     return text
 
 
+def _fast_wrap(text: str, width: int) -> List[str]:
+    # textwrap.wrap without the regex chunking: words and space runs are kept
+    # as chunks so inner spacing survives. Hyphen breaks need textwrap itself.
+    width = max(1, width)
+    if "-" in text:
+        return textwrap.wrap(text, width=width)
+    text = text.expandtabs().translate(_WRAP_WHITESPACE)
+    chunks: List[str] = []
+    run = 0
+    for index, piece in enumerate(text.split(" ")):
+        if index:
+            run += 1
+        if piece:
+            if run:
+                chunks.append(" " * run)
+                run = 0
+            chunks.append(piece)
+    if run:
+        chunks.append(" " * run)
+    chunks.reverse()
+    lines: List[str] = []
+    while chunks:
+        if lines and not chunks[-1].strip():
+            chunks.pop()
+        current: List[str] = []
+        current_len = 0
+        while chunks and current_len + len(chunks[-1]) <= width:
+            chunk = chunks.pop()
+            current.append(chunk)
+            current_len += len(chunk)
+        if chunks and len(chunks[-1]) > width:
+            chunk = chunks[-1]
+            cut = width - current_len
+            current.append(chunk[:cut])
+            chunks[-1] = chunk[cut:]
+        if current and not current[-1].strip():
+            current.pop()
+        if current:
+            lines.append("".join(current))
+    return lines
+
+
 def _symbol_at_cursor(state: UIState) -> Optional[str]:
     step = state.current_step()
-    code_lines = step.code.splitlines()
-    if not code_lines or state.code_cursor >= len(code_lines):
+    if not step.code:
+        return None
+    code_lines = _get_code_render(state, step)[0]
+    if state.code_cursor >= len(code_lines):
         return None
     line = code_lines[state.code_cursor]
-    match = re.search(r"([A-Za-z_][A-Za-z0-9_:]*)\s*\(", line)
+    match = _SYMBOL_CALL_RE.search(line)
     if match:
         return match.group(1)
-    match = re.search(r"\b([A-Za-z_][A-Za-z0-9_:]*)\b", line)
+    match = _SYMBOL_WORD_RE.search(line)
     if match:
         return match.group(1)
     return None
@@ -1147,12 +1385,12 @@ def _draw_box(
     _safe_addch(
         win, y + height - 1, x + width - 1, curses.ACS_LRCORNER, attr
     )
-    for col in range(x + 1, x + width - 1):
-        _safe_addch(win, y, col, curses.ACS_HLINE, attr)
-        _safe_addch(win, y + height - 1, col, curses.ACS_HLINE, attr)
-    for row in range(y + 1, y + height - 1):
-        _safe_addch(win, row, x, curses.ACS_VLINE, attr)
-        _safe_addch(win, row, x + width - 1, curses.ACS_VLINE, attr)
+    if width > 2:
+        _safe_hline(win, y, x + 1, width - 2, attr)
+        _safe_hline(win, y + height - 1, x + 1, width - 2, attr)
+    if height > 2:
+        _safe_vline(win, y + 1, x, height - 2, attr)
+        _safe_vline(win, y + 1, x + width - 1, height - 2, attr)
     if title:
         title_text = f" {title} "
         _safe_addstr(
@@ -1168,19 +1406,22 @@ def _fill_line(win, y: int, width: int, attr: int) -> None:
     _safe_addstr(win, y, 0, " " * (width - 1), attr)
 
 
-def _safe_addstr(win, y: int, x: int, text: str, attr: int = 0) -> None:
+def _safe_addstr(
+    win, y: int, x: int, text: str, attr: int = 0, max_len: Optional[int] = None
+) -> None:
     max_y, max_x = win.getmaxyx()
     if y < 0 or y >= max_y or x >= max_x:
         return
     if x < 0:
         text = text[-x:]
         x = 0
-    if x + len(text) > max_x:
-        text = text[: max(0, max_x - x)]
-    if not text:
+    limit = max_x - x
+    if max_len is not None and max_len < limit:
+        limit = max_len
+    if not text or limit <= 0:
         return
     try:
-        win.addstr(y, x, text, attr)
+        win.addnstr(y, x, text, limit, attr)
     except curses.error:
         pass
 
@@ -1195,11 +1436,31 @@ def _safe_addch(win, y: int, x: int, ch: int, attr: int = 0) -> None:
         pass
 
 
+def _safe_hline(win, y: int, x: int, length: int, attr: int) -> None:
+    max_y, max_x = win.getmaxyx()
+    if y < 0 or y >= max_y or x < 0 or x >= max_x:
+        return
+    try:
+        win.hline(y, x, curses.ACS_HLINE | attr, length)
+    except curses.error:
+        pass
+
+
+def _safe_vline(win, y: int, x: int, length: int, attr: int) -> None:
+    max_y, max_x = win.getmaxyx()
+    if y < 0 or y >= max_y or x < 0 or x >= max_x:
+        return
+    try:
+        win.vline(y, x, curses.ACS_VLINE | attr, length)
+    except curses.error:
+        pass
+
+
 def _truncate(text: str, width: int) -> str:
-    if width <= 0:
-        return ""
     if len(text) <= width:
         return text
+    if width <= 0:
+        return ""
     if width <= 3:
         return text[:width]
     return text[: width - 3] + "..."
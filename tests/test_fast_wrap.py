@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import textwrap
+import unittest
+
+from repowalk.ui.terminal import _fast_wrap
+
+
+class FastWrapTest(unittest.TestCase):
+    def assertMatchesTextwrap(self, text: str, width: int) -> None:
+        self.assertEqual(_fast_wrap(text, width), textwrap.wrap(text, width=width))
+
+    def test_hyphenated_input_matches_textwrap(self) -> None:
+        samples = [
+            "see repowalk/repo-scout/agent-tools.py for the long-running setup",
+            "a well-known, hand-rolled read-eval-print loop",
+            "--verbose --flow-diagrams --llm-log-path=/tmp/run-log.txt",
+            "x-" * 30,
+        ]
+        for text in samples:
+            for width in (5, 10, 17, 40):
+                with self.subTest(text=text, width=width):
+                    self.assertMatchesTextwrap(text, width)
+
+    def test_inner_spacing_and_tabs_match_textwrap(self) -> None:
+        samples = [
+            "Use  two  spaces between words here",
+            "x\ty\tz aligned\tcolumns of text",
+            "    indented line that needs wrapping somewhere",
+            "averyveryverylongidentifierwithoutbreaks and more",
+        ]
+        for text in samples:
+            for width in (4, 9, 16, 30):
+                with self.subTest(text=text, width=width):
+                    self.assertMatchesTextwrap(text, width)
+
+
+if __name__ == "__main__":
+    unittest.main()
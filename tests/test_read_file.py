@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from repowalk.repo_scout.agent import CodeWalkerTools
+
+
+class ReadFileRangeTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        root = Path(self._tmp.name)
+        (root / "a.txt").write_text("one\ntwo\nthree\n", encoding="utf-8")
+        self.tools = CodeWalkerTools(str(root))
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _lines(self, start_line=None, end_line=None):
+        full = self.tools.read_file("a.txt").output.split("\n")
+        start = max(0, (start_line or 1) - 1)
+        end = len(full) if end_line is None else end_line
+        return "\n".join(full[start:end])
+
+    def test_ranged_read_matches_full_read_slice(self) -> None:
+        for start_line in (None, 1, 2, 4, 5):
+            for end_line in (-5, -1, 0, 1, 2, 3, 4, 10):
+                with self.subTest(start_line=start_line, end_line=end_line):
+                    result = self.tools.read_file("a.txt", start_line, end_line)
+                    self.assertTrue(result.success)
+                    self.assertEqual(
+                        result.output, self._lines(start_line, end_line)
+                    )
+
+    def test_negative_end_line_uses_slice_semantics(self) -> None:
+        result = self.tools.read_file("a.txt", 1, -1)
+        self.assertEqual(result.output, "   1 | one\n   2 | two\n   3 | three")
+
+    def test_trailing_newline_line_is_numbered(self) -> None:
+        result = self.tools.read_file("a.txt", 3, 10)
+        self.assertEqual(result.output, "   3 | three\n   4 | ")
+
+
+if __name__ == "__main__":
+    unittest.main()